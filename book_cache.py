@@ -0,0 +1,340 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+from typing import Callable, Iterable, Iterator
+
+# orjson кодирует и читает книги групп в несколько раз быстрее модуля json,
+# но необязателен. Записи обоих модулей читаются любым из них
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Файл кэша по умолчанию: ~/.cache/book_to_json.sqlite3
+CACHE_FILE = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+                          'book_to_json.sqlite3')
+
+# Сколько мегабайт разобранных книг хранить в кэше
+CACHE_SIZE = 256
+
+# Входит во все хэши. Если parse_block начинает разбирать блоки
+# по-другому, версию нужно поменять, чтобы старые записи не использовались
+CACHE_VERSION = b'book_to_json 2'
+
+# Версия таблиц базы (PRAGMA user_version). Базу с другой версией
+# кэш создает заново
+SCHEMA_VERSION = 3
+
+# Среднее и наибольшее количество блоков в группе
+GROUP_SIZE = 256
+MAX_GROUP_SIZE = 4 * GROUP_SIZE
+
+# Размер хэша в байтах
+DIGEST_SIZE = 16
+
+# Сколько ключей проверяется одним запросом
+LOOKUP_SIZE = 500
+
+# Сколько изменений накапливается перед записью в базу
+FLUSH_SIZE = 64
+
+
+def iter_groups(blocks: Iterable[str]) -> Iterator[list]:
+    """
+    Разбивает поток блоков на группы по содержимому: группа заканчивается
+    на блоке, у которого CRC32 делится на GROUP_SIZE. Границы зависят только
+    от самих блоков, поэтому изменение, вставка или удаление книги меняет
+    одну-две группы, а остальные остаются такими же, как при прошлом запуске.
+
+    Yields:
+    group: list - список (текст блока, текст блока в UTF-8)
+    """
+    group = []
+    for block in blocks:
+        data = block.encode('utf-8')
+        group.append((block, data))
+        if zlib.crc32(data) % GROUP_SIZE == 0 or len(group) == MAX_GROUP_SIZE:
+            yield group
+            group = []
+    if group:
+        yield group
+
+
+def dumps_books(books: list) -> bytes:
+    """
+    Книги группы в JSON (UTF-8) для записи в кэш. В базе хранятся байты,
+    а не текст: так при чтении не нужно декодировать строку
+    """
+    if orjson is not None:
+        return orjson.dumps(books)
+    return json.dumps(books, ensure_ascii=False).encode('utf-8')
+
+
+def loads_books(data: bytes) -> list:
+    """
+    Книги группы из JSON, записанного dumps_books()
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def file_digest(filename: str, chunk_size: int = 1 << 20) -> bytes:
+    """
+    Хэш содержимого файла
+    """
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE, person=CACHE_VERSION)
+    with open(filename, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.digest()
+
+
+class BlockCache:
+    """
+    Кэш разобранных книг в файле SQLite.
+
+    Блоки (текст между "#### " и "[Amazon.com]") объединяются в группы
+    (см. iter_groups). Ключ записи - хэш BLAKE2b текстов блоков группы,
+    в таблице group_books по нему хранятся книги группы в JSON, а в таблице
+    groups - размер JSON и время последнего использования. Время обновляется
+    при каждом запуске, а SQLite при UPDATE переписывает строку целиком,
+    поэтому JSON лежит в отдельной таблице. Кэшировать каждый блок
+    отдельно нельзя: запрос к базе и json.loads для одного блока дольше,
+    чем его разбор.
+
+    Таблица files по хэшу содержимого файла хранит хэши его групп.
+    Неизменившийся файл не разбивается на блоки, а собирается из групп,
+    в измененном файле заново разбираются только группы с изменившимися блоками.
+
+    Для каждой записи хранится время последнего использования. evict()
+    удаляет самые старые группы, пока размер JSON всех групп не станет
+    меньше max_size мегабайт (LRU). Он просматривает всю таблицу групп,
+    поэтому вызывается один раз за запуск, а не при каждом закрытии.
+
+    Открытие базы дороже разбора небольшого файла, поэтому один BlockCache
+    нужно использовать для всех файлов, которые разбирает процесс.
+
+    Несколько процессов могут работать с одним файлом кэша одновременно:
+    база открывается в режиме WAL, а запись ждет освобождения блокировки.
+    """
+
+    def __init__(self, filename: str = CACHE_FILE, max_size: float = CACHE_SIZE) -> None:
+        """
+        Parameters:
+        filename: str - файл базы SQLite (создается, если его нет)
+        max_size: float - предельный размер записей в мегабайтах
+        """
+        if max_size < 0:
+            raise ValueError("Размер кэша не может быть отрицательным")
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.max_size = int(max_size * 2**20)
+        # Сколько групп взято из кэша и сколько разобрано заново
+        self.hits = 0
+        self.misses = 0
+        # Изменения, которые еще не записаны в базу
+        self.new_groups = []
+        self.new_files = []
+        self.used_groups = []
+        self.used_files = []
+
+        self.connection = sqlite3.connect(filename, timeout=60, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        if self.connection.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+            self.create_tables()
+
+    def create_tables(self) -> None:
+        """
+        Создает таблицы кэша. Таблицы другой версии удаляются вместе с записями
+        """
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            # Другой процесс мог создать таблицы, пока ждали блокировку
+            if self.connection.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                for table in ('groups', 'group_books', 'files'):
+                    self.connection.execute(f'DROP TABLE IF EXISTS {table}')
+                self.connection.execute('CREATE TABLE groups ('
+                                        'digest BLOB PRIMARY KEY, '
+                                        'size INTEGER NOT NULL, '
+                                        'last_used REAL NOT NULL)')
+                self.connection.execute('CREATE TABLE group_books ('
+                                        'digest BLOB PRIMARY KEY, '
+                                        'books BLOB NOT NULL)')
+                self.connection.execute('CREATE TABLE files ('
+                                        'digest BLOB PRIMARY KEY, '
+                                        'groups BLOB NOT NULL, '
+                                        'last_used REAL NOT NULL)')
+                self.connection.execute('CREATE INDEX groups_last_used ON groups (last_used)')
+                self.connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            self.connection.execute('COMMIT')
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+
+    def __enter__(self) -> 'BlockCache':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @staticmethod
+    def digest(group: list) -> bytes:
+        """
+        Ключ группы блоков в кэше
+        """
+        digest = hashlib.blake2b(digest_size=DIGEST_SIZE, person=CACHE_VERSION)
+        for _, data in group:
+            digest.update(len(data).to_bytes(8, 'little'))
+            digest.update(data)
+        return digest.digest()
+
+    def lookup(self, digest: bytes) -> list:
+        """
+        Книги группы из кэша или None, если группы в кэше нет
+        """
+        row = self.connection.execute('SELECT books FROM group_books WHERE digest = ?',
+                                      (digest,)).fetchone()
+        if row is None:
+            return None
+        self.used_groups.append(digest)
+        return loads_books(row[0])
+
+    def lookup_file(self, digest: bytes) -> list:
+        """
+        Книги файла из кэша или None, если файла нет в кэше
+        или часть его групп уже удалена из кэша.
+
+        Группы читаются запросами по LOOKUP_SIZE ключей без транзакции:
+        если другой процесс успеет удалить группу, она просто не найдется
+        и файл будет разобран заново
+        """
+        row = self.connection.execute('SELECT groups FROM files WHERE digest = ?',
+                                      (digest,)).fetchone()
+        if row is None:
+            return None
+        groups = [row[0][i:i + DIGEST_SIZE] for i in range(0, len(row[0]), DIGEST_SIZE)]
+
+        unique_groups = list(set(groups))
+        found = {}
+        for i in range(0, len(unique_groups), LOOKUP_SIZE):
+            part = unique_groups[i:i + LOOKUP_SIZE]
+            found.update(self.connection.execute(f'SELECT digest, books FROM group_books '
+                                                 f'WHERE digest IN ({",".join("?" * len(part))})',
+                                                 part))
+        if len(found) != len(unique_groups):
+            return None
+        self.used_files.append(digest)
+        self.used_groups.extend(unique_groups)
+        self.hits += len(groups)
+        return [book for group in groups for book in loads_books(found[group])]
+
+    def parse(self, blocks: Iterable[str], parse_block: Callable,
+              file_digest: bytes = None) -> Iterator[dict]:
+        """
+        То же, что parse_block для каждого блока, но группы блоков, которые
+        уже есть в кэше, не разбираются, а новые добавляются в кэш.
+
+        Parameters:
+        blocks: Iterable[str] - тексты книг (например, из iter_blocks). Если файл
+        найден в кэше, blocks не перебираются, поэтому лучше передавать генератор
+        parse_block: Callable - функция, которая разбирает один блок в список книг
+        file_digest: bytes - хэш файла, из которого взяты блоки (см. file_digest)
+
+        Yields:
+        book: dict - книги в порядке следования блоков
+        """
+        if file_digest is not None:
+            books = self.lookup_file(file_digest)
+            if books is not None:
+                yield from books
+                return
+
+        groups = []
+        for group in iter_groups(blocks):
+            digest = self.digest(group)
+            groups.append(digest)
+            books = self.lookup(digest)
+            if books is None:
+                books = [book for block, _ in group for book in parse_block(block)]
+                self.new_groups.append((digest, dumps_books(books)))
+                self.misses += 1
+            else:
+                self.hits += 1
+
+            if len(self.new_groups) + len(self.used_groups) >= FLUSH_SIZE:
+                self.flush()
+            yield from books
+
+        if file_digest is not None:
+            self.new_files.append((file_digest, b''.join(groups)))
+
+    def flush(self) -> None:
+        """
+        Записывает новые записи и время использования найденных одной транзакцией
+        """
+        now = time.time()
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            self.connection.executemany('INSERT OR REPLACE INTO groups VALUES (?, ?, ?)',
+                                        [(digest, len(books), now)
+                                         for digest, books in self.new_groups])
+            self.connection.executemany('INSERT OR REPLACE INTO group_books VALUES (?, ?)',
+                                        self.new_groups)
+            self.connection.executemany('INSERT OR REPLACE INTO files VALUES (?, ?, ?)',
+                                        [(digest, groups, now)
+                                         for digest, groups in self.new_files])
+            self.connection.executemany('UPDATE groups SET last_used = ? WHERE digest = ?',
+                                        [(now, digest) for digest in self.used_groups])
+            self.connection.executemany('UPDATE files SET last_used = ? WHERE digest = ?',
+                                        [(now, digest) for digest in self.used_files])
+            self.connection.execute('COMMIT')
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        self.new_groups = []
+        self.new_files = []
+        self.used_groups = []
+        self.used_files = []
+
+    def evict(self) -> None:
+        """
+        Удаляет давно не использованные группы сверх max_size
+        и файлы, которые старше всех оставшихся групп
+        """
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            self.connection.execute('CREATE TEMP TABLE IF NOT EXISTS evicted (digest BLOB)')
+            self.connection.execute('DELETE FROM evicted')
+            self.connection.execute('INSERT INTO evicted '
+                                    'SELECT digest FROM ('
+                                    'SELECT digest, SUM(size) OVER ('
+                                    'ORDER BY last_used DESC ROWS UNBOUNDED PRECEDING) AS total '
+                                    'FROM groups) '
+                                    'WHERE total > ?', (self.max_size,))
+            self.connection.execute('DELETE FROM groups WHERE digest IN (SELECT digest FROM evicted)')
+            self.connection.execute('DELETE FROM group_books '
+                                    'WHERE digest IN (SELECT digest FROM evicted)')
+            self.connection.execute('DELETE FROM files WHERE last_used < '
+                                    '(SELECT COALESCE(MIN(last_used), 1e300) FROM groups)')
+            self.connection.execute('COMMIT')
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+
+    def close(self) -> None:
+        """
+        Записывает накопленные изменения и закрывает базу.
+        Повторный вызов ничего не делает
+        """
+        if self.connection is None:
+            return
+        self.flush()
+        self.connection.close()
+        self.connection = None
@@ -0,0 +1,112 @@
+import os
+import sys
+import argparse
+import subprocess
+import tempfile
+from typing import ClassVar
+
+# Скрипт, скорость которого измеряется
+GENERATOR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         'random_book_generator.py')
+
+# Аргументы сабпарсера для каждого режима вывода;
+# {output} заменяется на имя файла во временной папке
+MODES = {'stdout': [],
+         'json': ['json', '-j', '{output}'],
+         'csv': ['csv', '-v', '{output}'],
+         'ndjson': ['ndjson', '-f', '{output}'],
+         'parquet': ['parquet', '-f', '{output}'],
+         'arrow': ['arrow', '-f', '{output}'],
+         'sqlite': ['sqlite', '-f', '{output}.sqlite3'],
+}
+
+
+def create_parser() -> ClassVar:
+    """
+    Парсер аргументов командной строки
+    """
+    parser = argparse.ArgumentParser(description='Скорость и память random_book_generator.py')
+    parser.add_argument('-c', '--counts',
+                        type=int,
+                        nargs='+',
+                        default=[1000, 10000, 100000, 1000000],
+                        help='Количество книг в прогонах')
+    parser.add_argument('-m', '--modes',
+                        nargs='+',
+                        choices=list(MODES),
+                        default=['stdout', 'json', 'csv'],
+                        help='Режимы вывода')
+    parser.add_argument('-w', '--workers',
+                        type=int,
+                        default=1,
+                        help='Количество процессов генератора')
+    parser.add_argument('--seed',
+                        type=int,
+                        default=0,
+                        help='Зерно, чтобы прогоны были одинаковыми')
+    return parser
+
+
+def peak_memory(rusage) -> float:
+    """
+    Пиковый размер резидентной памяти процесса в МБ
+    (ru_maxrss в Linux - в КБ, в macOS - в байтах)
+    """
+    if sys.platform == 'darwin':
+        return rusage.ru_maxrss / 2**20
+    return rusage.ru_maxrss / 2**10
+
+
+def run(mode: str, count: int, workers: int, seed: int) -> tuple:
+    """
+    Один прогон генератора в отдельном процессе. Время генерации берется
+    из строки "Всего" вывода --profile: запуск интерпретатора и импорт
+    numpy на небольших прогонах дольше самой генерации
+
+    Returns:
+    tuple - (время в секундах, пиковая память в МБ)
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output = os.path.join(tmp_dir, 'books')
+        command = [sys.executable, GENERATOR, str(count),
+                   '--seed', str(seed), '--workers', str(workers), '--profile']
+        command += [arg.format(output=output) for arg in MODES[mode]]
+
+        # Генератор читает books.txt и authors.txt из текущей папки
+        process = subprocess.Popen(command,
+                                   cwd=os.path.dirname(GENERATOR),
+                                   stdout=subprocess.DEVNULL,
+                                   stderr=subprocess.PIPE,
+                                   text=True)
+        profile = process.stderr.read()
+        process.stderr.close()
+        # os.wait4 возвращает потребление ресурсов именно этого процесса;
+        # память процессов --workers сюда не входит
+        _, status, rusage = os.wait4(process.pid, 0)
+        # Popen не знает, что процесс уже завершен, и иначе ждал бы его в __del__
+        process.returncode = os.waitstatus_to_exitcode(status)
+
+    if process.returncode != 0:
+        raise RuntimeError(f"Генератор завершился с ошибкой: {' '.join(command)}\n{profile}")
+    elapsed = next(float(line.split()[1]) for line in profile.splitlines()
+                   if line.startswith('Всего'))
+    return elapsed, peak_memory(rusage)
+
+
+def main() -> None:
+    """
+    Запускает генератор для каждого режима и количества книг
+    и выводит таблицу: время, книг в секунду, пиковая память
+    """
+    args = create_parser().parse_args()
+
+    print(f'{"Режим":<10}{"Книг":>10}{"Время, с":>12}{"Книг/с":>12}{"Память, МБ":>13}')
+    for mode in args.modes:
+        for count in args.counts:
+            elapsed, memory = run(mode, count, args.workers, args.seed)
+            print(f'{mode:<10}{count:>10}{elapsed:>12.4f}'
+                  f'{count / elapsed:>12,.0f}{memory:>13.1f}', flush=True)
+
+
+if __name__ == '__main__':
+    main()
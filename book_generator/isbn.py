@@ -0,0 +1,126 @@
+import numpy as np
+
+# Префиксы EAN, с которых начинаются номера ISBN-13
+PREFIXES = (978, 979)
+
+# После префикса идут 9 цифр: группа (1), издатель (4), издание (4)
+BODY_SIZE = 10**9
+
+# Количество различных номеров, которые может выдать генератор
+ISBN_SPACE = len(PREFIXES) * BODY_SIZE
+
+# Веса цифр при вычислении контрольной цифры ISBN-13: 1, 3, 1, 3, ...
+WEIGHTS = np.array([1, 3] * 6, dtype=np.int64)
+POWERS = 10 ** np.arange(11, -1, -1, dtype=np.int64)
+
+
+def check_digit(digits: str) -> int:
+    """
+    Контрольная цифра ISBN-13
+
+    Parameters:
+    digits: str - первые 12 цифр номера (дефисы допускаются)
+
+    Returns:
+    int - цифра, при которой взвешенная сумма всех 13 цифр делится на 10
+    """
+    digits = digits.replace('-', '')
+    if len(digits) != 12 or not digits.isdigit():
+        raise ValueError("Для контрольной цифры нужно ровно 12 цифр")
+
+    total = sum(int(digit) * weight for digit, weight in zip(digits, (1, 3) * 6))
+    return (10 - total % 10) % 10
+
+
+def is_valid(isbn: str) -> bool:
+    """
+    Проверяет контрольную цифру номера ISBN-13
+    """
+    digits = isbn.replace('-', '')
+    if len(digits) != 13 or not digits.isdigit():
+        return False
+    return check_digit(digits[:12]) == int(digits[12])
+
+
+def format_number(number: int) -> str:
+    """
+    Превращает порядковый номер из диапазона [0, ISBN_SPACE)
+    в строку ISBN-13 вида 978-5-1234-5678-9
+    """
+    prefix = PREFIXES[number // BODY_SIZE]
+    body = number % BODY_SIZE
+    check = check_digit(f'{prefix}{body:09d}')
+    return f'{prefix}-{body // 10**8}-{body // 10**4 % 10**4:04d}-{body % 10**4:04d}-{check}'
+
+
+def format_isbn13(numbers: np.ndarray) -> list:
+    """
+    То же, что format_number, но для массива номеров:
+    контрольные цифры считаются для всего массива сразу.
+    """
+    numbers = np.asarray(numbers, dtype=np.int64)
+    prefixes = np.array(PREFIXES, dtype=np.int64)[numbers // BODY_SIZE]
+    bodies = numbers % BODY_SIZE
+
+    digits = (((prefixes * BODY_SIZE + bodies)[:, None] // POWERS) % 10)
+    checks = (10 - (digits @ WEIGHTS) % 10) % 10
+
+    return [f'{prefix}-{body // 10**8}-{body // 10**4 % 10**4:04d}-{body % 10**4:04d}-{check}'
+            for prefix, body, check in zip(prefixes.tolist(), bodies.tolist(), checks.tolist())]
+
+
+class Isbn13Generator:
+    """
+    Генератор случайных номеров ISBN-13 с правильной контрольной цифрой.
+
+    При unique=True номера не повторяются: i-й выданный номер равен
+    (a*i + b) mod ISBN_SPACE, где a взаимно просто с ISBN_SPACE.
+    Такое отображение - перестановка диапазона, поэтому первые
+    ISBN_SPACE номеров различны, а a и b берутся из seed.
+    """
+
+    def __init__(self, seed=None, unique: bool = False, start: int = 0) -> None:
+        """
+        Parameters:
+        seed - зерно или готовый np.random.Generator
+        unique: bool - гарантировать отсутствие повторов
+        start: int - сколько уникальных номеров пропустить. Генераторы с одним
+        seed и разными start выдают непересекающиеся участки одной перестановки
+        """
+        self.rng = np.random.default_rng(seed)
+        self.unique = unique
+        self.issued = start
+
+        # ISBN_SPACE = 2**10 * 5**9, значит a должно быть нечетным и не кратным 5
+        multiplier = int(self.rng.integers(1, ISBN_SPACE))
+        while multiplier % 2 == 0 or multiplier % 5 == 0:
+            multiplier += 1
+        self.multiplier = multiplier
+        self.offset = int(self.rng.integers(0, ISBN_SPACE))
+
+    def batch(self, size: int, rng=None) -> list:
+        """
+        Список из size номеров ISBN-13
+
+        Parameters:
+        size: int - количество номеров
+        rng - источник случайных чисел вместо self.rng (например, PkRandom);
+        уникальные номера от него не зависят
+        """
+        if not self.unique:
+            rng = self.rng if rng is None else rng
+            return format_isbn13(rng.integers(0, ISBN_SPACE, size))
+
+        if self.issued + size > ISBN_SPACE:
+            raise ValueError("Уникальные номера ISBN-13 закончились")
+        indexes = np.arange(self.issued, self.issued + size, dtype=np.int64)
+        self.issued += size
+        return format_isbn13((indexes * self.multiplier + self.offset) % ISBN_SPACE)
+
+    def __call__(self) -> str:
+        """
+        Один номер ISBN-13
+        """
+        if not self.unique:
+            return format_number(int(self.rng.integers(0, ISBN_SPACE)))
+        return self.batch(1)[0]
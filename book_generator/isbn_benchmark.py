@@ -0,0 +1,65 @@
+import argparse
+import time
+from typing import Callable
+from isbn import Isbn13Generator, is_valid
+
+
+def measure(name: str, function: Callable, count: int) -> None:
+    """
+    Выводит время, за которое function() создает count номеров ISBN-13
+
+    Parameters:
+    name: str - название способа генерации
+    function: Callable - функция, которая возвращает список из count номеров
+    count: int - количество номеров
+    """
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+
+    if len(result) != count or not all(is_valid(isbn) for isbn in result):
+        raise ValueError(f"{name}: получены неверные номера ISBN-13")
+    print(f'{name:<40}{elapsed:>10.3f} с {count / elapsed:>14,.0f} номеров/с')
+
+
+def main() -> None:
+    """
+    Сравнивает прежний способ (новый Faker() на каждый номер)
+    с генератором Isbn13Generator
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('count',
+                        type=int,
+                        nargs='?',
+                        default=1000,
+                        help='Количество номеров ISBN-13')
+    args = parser.parse_args()
+    count = args.count
+
+    try:
+        from faker import Faker
+    except ImportError:
+        print('Faker не установлен, сравнение с ним пропущено')
+    else:
+        measure('Faker() на каждый номер',
+                lambda: [Faker().isbn13() for _ in range(count)], count)
+        faker = Faker()
+        measure('Один экземпляр Faker',
+                lambda: [faker.isbn13() for _ in range(count)], count)
+
+    generator = Isbn13Generator(seed=0)
+    measure('Isbn13Generator, по одному',
+            lambda: [generator() for _ in range(count)], count)
+    measure('Isbn13Generator, пакетом',
+            lambda: generator.batch(count), count)
+
+    unique_generator = Isbn13Generator(seed=0, unique=True)
+    result = unique_generator.batch(count)
+    if len(set(result)) != count:
+        raise ValueError("Isbn13Generator(unique=True) выдал повторяющиеся номера")
+    measure('Isbn13Generator(unique=True), пакетом',
+            lambda: unique_generator.batch(count), count)
+
+
+if __name__ == '__main__':
+    main()
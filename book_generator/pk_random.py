@@ -0,0 +1,90 @@
+import numpy as np
+
+MASK64 = (1 << 64) - 1
+
+# Константы SplitMix64
+GAMMA = 0x9E3779B97F4A7C15
+MIX1 = 0xBF58476D1CE4E5B9
+MIX2 = 0x94D049BB133111EB
+
+
+def mix64(x: int) -> int:
+    """
+    Перемешивающая функция SplitMix64 для одного 64-битного числа
+    """
+    x = (x + GAMMA) & MASK64
+    x = ((x ^ (x >> 30)) * MIX1) & MASK64
+    x = ((x ^ (x >> 27)) * MIX2) & MASK64
+    return x ^ (x >> 31)
+
+
+def mix64_array(x: np.ndarray) -> np.ndarray:
+    """
+    Перемешивание SplitMix64 для массива np.uint64 без прибавления GAMMA:
+    сдвиг по последовательности задает сам аргумент (см. PkRandom.bits).
+    Умножение np.uint64 в массивах переполняется по модулю 2**64, как и нужно
+    """
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(MIX1)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(MIX2)
+    return x ^ (x >> np.uint64(31))
+
+
+class PkRandom:
+    """
+    Источник случайных чисел для пакета книг, в котором значение
+    для книги зависит только от (seed, pk, номер вызова).
+
+    Повторяет методы np.random.Generator, которые использует book_batches(),
+    но каждый вызов integers/uniform возвращает по одному числу на книгу
+    из pks. Номер вызова играет роль номера поля, поэтому любую книгу
+    или диапазон книг можно получить заново за O(1) на книгу,
+    не генерируя предыдущие.
+    """
+
+    def __init__(self, seed: int, pks: np.ndarray) -> None:
+        """
+        Parameters:
+        seed: int - зерно генерации
+        pks: np.ndarray - номера книг пакета
+        """
+        if seed < 0:
+            raise ValueError("Зерно должно быть неотрицательным")
+        self.key = mix64(seed & MASK64)
+        self.pks = np.asarray(pks).astype(np.uint64)
+        self.calls = 0
+
+    def bits(self) -> np.ndarray:
+        """
+        По 64 случайных бита на книгу для очередного вызова
+        """
+        stream_key = mix64(self.key ^ mix64(self.calls))
+        self.calls += 1
+        return mix64_array(self.pks * np.uint64(GAMMA) + np.uint64(stream_key))
+
+    def random(self, size: int = None) -> np.ndarray:
+        """
+        Числа из [0, 1), по одному на книгу
+        """
+        self.check_size(size)
+        return (self.bits() >> np.uint64(11)) * (1.0 / (1 << 53))
+
+    def integers(self, low: int, high: int, size: int = None) -> np.ndarray:
+        """
+        Целые числа из [low, high), по одному на книгу
+        """
+        return low + (self.random(size) * (high - low)).astype(np.int64)
+
+    def uniform(self, low: float, high: float, size: int = None) -> np.ndarray:
+        """
+        Вещественные числа из [low, high), по одному на книгу
+        """
+        return low + self.random(size) * (high - low)
+
+    def check_size(self, size: int) -> None:
+        """
+        Проверяет, что запрошено столько чисел, сколько книг в пакете
+        """
+        if size is not None and size != len(self.pks):
+            raise ValueError("PkRandom выдает ровно одно число на книгу пакета")
@@ -1,16 +1,57 @@
 import re 
+import csv
 import json
-import pandas as pd
+import time
+import os
+import sys
 import random
+import shutil
 import argparse
-from faker import Faker
-from typing import ClassVar, Callable
-from itertools import cycle
+import tempfile
+from multiprocessing import Pool
+import numpy as np
+from typing import ClassVar, Callable, Iterable, Iterator
+from functools import lru_cache
+from itertools import islice
+from contextlib import contextmanager
+from collections import defaultdict
+import gzip
+import sqlite3
 import conf
+from isbn import Isbn13Generator
+from pk_random import PkRandom
+
+# pyarrow импортируется только для parquet, arrow и sqlite из нескольких
+# процессов (см. load_pyarrow): импорт занимает около 0,1 с
+pa = None
+pq = None
 
 # Паттерн для поиска строк формата "Имя Фамилия"
 AUTHOR_PATTERN = re.compile(r'[А-Я]\w+\s+[А-Я]\w+')
 
+# Количество книг, генерируемых за один проход в пакетном режиме
+BATCH_SIZE = 10000
+
+# Сколько записей накапливается в памяти перед записью в файл
+BUFFER_SIZE = 1000
+
+# Заголовок CSV файла
+CSV_HEADER = ('pk', 'model', 'fields')
+
+# Команды, которые записывают книги колонками через pyarrow
+COLUMNAR_COMMANDS = ('parquet', 'arrow')
+
+# Сколько книг записывается в SQLite в одной транзакции
+TRANSACTION_SIZE = 1000000
+
+# Этапы генерации, время которых выводит --profile.
+# Все остальное время работы считается временем записи (writer)
+GENERATION_STAGES = ('random_title', 'random_author', 'random_isbn13',
+                     'random_fields', 'batch_to_books')
+
+# Суммарное время этапов генерации в секундах
+STAGE_TIMES = defaultdict(float)
+
 
 def create_parser() -> ClassVar:
     """
@@ -28,6 +69,31 @@ def create_parser() -> ClassVar:
     parser.add_argument('-a', '--authors',
                          type=int, 
                          help='Количество авторов для каждого элемента')
+    parser.add_argument('-z', '--zipf',
+                        type=float,
+                        help='Показатель распределения Ципфа: чем он больше, '
+                             'тем чаще встречаются авторы из начала файла')
+    parser.add_argument('-b', '--batch_size',
+                        type=int,
+                        default=BATCH_SIZE,
+                        help='Количество книг, генерируемых за один проход')
+    parser.add_argument('-u', '--unique_isbn',
+                        action='store_true',
+                        default=False,
+                        help='Генерировать неповторяющиеся номера ISBN-13')
+    parser.add_argument('--seed',
+                        type=int,
+                        help='Зерно генерации. С ним каждая книга определяется '
+                             'только зерном и своим номером, поэтому любой диапазон '
+                             'номеров (--pk и count) можно сгенерировать заново отдельно')
+    parser.add_argument('-w', '--workers',
+                        type=int,
+                        default=1,
+                        help='Количество процессов для генерации')
+    parser.add_argument('--profile',
+                        action='store_true',
+                        default=False,
+                        help='Вывести в stderr время каждого этапа генерации')
     parser.add_argument('-s', '--sale',
                         action='store_true', 
                         default=False,
@@ -36,6 +102,10 @@ def create_parser() -> ClassVar:
     subparsers = parser.add_subparsers(dest='command')
     subparser_json(subparsers)
     subparser_csv(subparsers)
+    subparser_ndjson(subparsers)
+    subparser_parquet(subparsers)
+    subparser_arrow(subparsers)
+    subparser_sqlite(subparsers)
     
     return parser
     
@@ -81,72 +151,266 @@ def subparser_csv(subparsers) -> Callable:
     return csv_subparser
 
 
+def subparser_ndjson(subparsers) -> Callable:
+    """
+    Сабпарсер для вывода в NDJSON (одна книга в строке)
+    """
+    ndjson_subparser = subparsers.add_parser('ndjson',
+                                             help='Режим вывода в NDJSON')
+    ndjson_subparser.add_argument('-f', '--ndjson_filename',
+                                  dest='ndjson_filename',
+                                  required=True,
+                                  help='Имя файла для вывода результата')
+    ndjson_subparser.add_argument('-c', '--compression',
+                                  choices=('none', 'gzip'),
+                                  default='none',
+                                  help='Сжатие файла')
+
+    return ndjson_subparser
+
+
+def subparser_parquet(subparsers) -> Callable:
+    """
+    Сабпарсер для вывода в Parquet
+    """
+    parquet_subparser = subparsers.add_parser('parquet',
+                                              help='Режим вывода в Parquet')
+    parquet_subparser.add_argument('-f', '--parquet_filename',
+                                   dest='parquet_filename',
+                                   required=True,
+                                   help='Имя файла для вывода результата')
+    parquet_subparser.add_argument('-c', '--compression',
+                                   choices=('none', 'snappy', 'gzip', 'brotli', 'lz4', 'zstd'),
+                                   default='zstd',
+                                   help='Сжатие страниц Parquet')
+
+    return parquet_subparser
+
+
+def subparser_arrow(subparsers) -> Callable:
+    """
+    Сабпарсер для вывода в файл Arrow IPC
+    """
+    arrow_subparser = subparsers.add_parser('arrow',
+                                            help='Режим вывода в Arrow IPC')
+    arrow_subparser.add_argument('-f', '--arrow_filename',
+                                 dest='arrow_filename',
+                                 required=True,
+                                 help='Имя файла для вывода результата')
+    arrow_subparser.add_argument('-c', '--compression',
+                                 choices=('none', 'lz4', 'zstd'),
+                                 default='lz4',
+                                 help='Сжатие буферов Arrow. Без сжатия файл '
+                                      'можно читать через memory map без копирования')
+
+    return arrow_subparser
+
+
+def subparser_sqlite(subparsers) -> Callable:
+    """
+    Сабпарсер для записи книг прямо в базу SQLite
+    """
+    sqlite_subparser = subparsers.add_parser('sqlite',
+                                             help='Режим записи в базу SQLite')
+    sqlite_subparser.add_argument('-f', '--sqlite_filename',
+                                  dest='sqlite_filename',
+                                  required=True,
+                                  help='Файл базы данных (создается, если его нет). '
+                                       'Книги дописываются к уже записанным, поэтому '
+                                       '--pk должен быть больше их номеров')
+    sqlite_subparser.add_argument('-t', '--transaction_size',
+                                  type=int,
+                                  default=TRANSACTION_SIZE,
+                                  help='Количество книг в одной транзакции. '
+                                       'Книги вставляются пакетами по --batch_size')
+
+    return sqlite_subparser
+
+
+class Corpus:
+    """
+    Загруженный в память корпус названий книг и имен авторов.
+
+    Файлы conf.TITLES и conf.AUTHORS читаются один раз, проверка
+    строк паттерном AUTHOR_PATTERN тоже выполняется один раз при загрузке.
+    Строки хранятся в кортежах, поэтому выбор случайного элемента
+    по индексу выполняется за O(1).
+    """
+    __slots__ = ('titles', 'authors', 'cumulative_weights')
+
+    def __init__(self, titles: tuple, authors: tuple) -> None:
+        if not titles:
+            raise ValueError("Список названий книг пуст")
+        if not authors:
+            raise ValueError("Список авторов пуст")
+        self.titles = titles
+        self.authors = authors
+        self.cumulative_weights = {}
+
+    @classmethod
+    def load(cls, titles_file: str = conf.TITLES,
+             authors_file: str = conf.AUTHORS) -> 'Corpus':
+        """
+        Читает и проверяет файлы с названиями книг и именами авторов
+
+        Parameters:
+        titles_file: str - файл с названиями книг, по одному на строку
+        authors_file: str - файл с именами авторов, по одному на строку
+        """
+        with open(titles_file, 'rt') as file:
+            titles = tuple(line.strip() for line in file if line.strip())
+
+        authors = []
+        with open(authors_file, 'rt') as file:
+            for line in file:
+                if not AUTHOR_PATTERN.search(line):
+                    raise ValueError("Файл содержит строку, не совпадающую с паттерном")
+                authors.append(line.strip())
+
+        # dict.fromkeys убирает повторяющиеся имена, сохраняя порядок строк,
+        # чтобы у одной книги не оказалось двух одинаковых авторов
+        return cls(titles, tuple(dict.fromkeys(authors)))
+
+    def title(self) -> str:
+        """
+        Случайное название книги
+        """
+        return self.titles[random.randrange(len(self.titles))]
+
+    def author(self, number_of_author: int) -> list:
+        """
+        Список из number_of_author различных случайных авторов
+        """
+        # random.sample выбирает индексы без повторений,
+        # поэтому имена в списке не повторяются
+        indexes = random.sample(range(len(self.authors)), number_of_author)
+        return [self.authors[i] for i in indexes]
+
+    def title_batch(self, rng: np.random.Generator, size: int) -> list:
+        """
+        Список из size случайных названий книг
+        """
+        titles = self.titles
+        return [titles[i] for i in rng.integers(0, len(titles), size).tolist()]
+
+    def zipf_weights(self, exponent: float) -> np.ndarray:
+        """
+        Накопленные веса авторов для распределения Ципфа:
+        автор в i-й строке файла (считая с 1) имеет вес 1 / i**exponent.
+        Массив считается один раз для каждого exponent
+        """
+        if exponent not in self.cumulative_weights:
+            ranks = np.arange(1, len(self.authors) + 1, dtype=np.float64)
+            self.cumulative_weights[exponent] = np.cumsum(ranks ** -exponent)
+        return self.cumulative_weights[exponent]
+
+    def author_batch(self, rng: np.random.Generator,
+                     numbers: np.ndarray,
+                     zipf: float = None) -> list:
+        """
+        Списки различных случайных авторов для целого пакета книг.
+        numbers[i] - количество авторов у i-й книги.
+
+        Для всех книг сразу выбирается max(numbers) различных индексов:
+        j-й индекс берется из диапазона [0, n - j) и сдвигается
+        через уже выбранные индексы (в порядке возрастания), поэтому
+        повторов не бывает, а первые numbers[i] индексов строки
+        образуют равномерную выборку без повторений.
+        На выбор k авторов уходит O(k) операций независимо от длины файла.
+
+        Если задан zipf, авторы выбираются с весами zipf_weights(zipf),
+        так что у первых авторов файла оказывается больше книг.
+        Сдвиг делается так же, только в пространстве весов:
+        точка берется из [0, W - веса выбранных) и перескакивает
+        отрезки уже выбранных авторов, а автор находится двоичным
+        поиском по накопленным весам.
+        """
+        size = len(numbers)
+        max_number = int(numbers.max()) if size else 0
+        if max_number > len(self.authors):
+            raise ValueError("Авторов в файле меньше, чем требуется для одной книги")
+
+        picks = np.empty((size, max_number), dtype=np.int64)
+        if zipf is None:
+            for j in range(max_number):
+                index = rng.integers(0, len(self.authors) - j, size)
+                for chosen in np.sort(picks[:, :j], axis=1).T:
+                    index += index >= chosen
+                picks[:, j] = index
+        else:
+            cumulative = self.zipf_weights(zipf)
+            weights = np.diff(cumulative, prepend=0.0)
+            taken = np.zeros(size)
+            for j in range(max_number):
+                point = rng.random(size) * (cumulative[-1] - taken)
+                for chosen in np.sort(picks[:, :j], axis=1).T:
+                    point += np.where(point >= cumulative[chosen] - weights[chosen],
+                                      weights[chosen], 0.0)
+                index = np.minimum(np.searchsorted(cumulative, point, side='right'),
+                                   len(self.authors) - 1)
+
+                # Из-за округления точка может остаться на границе
+                # выбранного отрезка - тогда берем следующего автора
+                repeated = (picks[:, :j] == index[:, None]).any(axis=1)
+                while repeated.any():
+                    index[repeated] = (index[repeated] + 1) % len(self.authors)
+                    repeated = (picks[:, :j] == index[:, None]).any(axis=1)
+
+                picks[:, j] = index
+                taken += weights[index]
+
+        authors = self.authors
+        return [[authors[i] for i in row[:number]]
+                for row, number in zip(picks.tolist(), numbers.tolist())]
+
+
+@lru_cache(maxsize=None)
+def get_corpus() -> Corpus:
+    """
+    Корпус, загруженный из conf.TITLES и conf.AUTHORS.
+    Файлы читаются только при первом вызове.
+    """
+    return Corpus.load()
+
+
 def random_author(number_of_author) -> list:
     """
     Выбирает случайный список атворов длиной number_of_author из файла conf.AUTHORS
-    
-    Еслм мы заранее не знаем сколько строк в файле conf.AUTHORS,
-    то зацикливаем его с помощью itertools.cycle(). Тогда
-    в random_lines могут лежать номера строк из дапазона, верхняя 
-    граница которого больше, чем количество строк в файле.
     """
-    # количество элементов в два раза первышает number_of_author
-    # чтобы authors точно заполнился до нужного количества элементов = number_of_author
-    random_lines = random.sample(range(0,1000), 2*number_of_author)
-    
-    # set() выбран, чтобы в authors не встретилось повторяющихся имен
-    authors = set()
-    
-    with open(conf.AUTHORS, 'rt') as file:
-        current_line = 0
-        cycle_file = cycle(file)
-        while len(authors) < number_of_author:
-            line = next(cycle_file)
-            if not AUTHOR_PATTERN.search(line):
-                raise ValueError("Файл содержит строку, не совпадающую с паттерном")
-            if AUTHOR_PATTERN.search(line) and current_line in random_lines:
-                authors.add(line.strip())
-            current_line += 1
-
-    return list(authors)
+    return get_corpus().author(number_of_author)
     
 
 def random_title() -> str:
     """
     Выбирает случейное название книги из файла conf.TITLES
     """
-    random_line = random.randint(0, 1000)
-    i = 0
-    
-    with open(conf.TITLES, 'rt') as file:
-        cycle_file = cycle(file)
-        result = ''
-        
-        while result == '':
-            line = next(cycle_file)
-            if i == random_line:
-                result = line.strip()
-            i += 1
-
-    return result
+    return get_corpus().title()
         
     
+@lru_cache(maxsize=None)
+def get_isbn_generator() -> Isbn13Generator:
+    """
+    Генератор номеров ISBN-13, общий для всех вызовов random_isbn13()
+    """
+    return Isbn13Generator()
+
+
 def random_isbn13() -> str:
     """
     Генерирует случайный номер ISBN
     """
-    faker = Faker()
-    return faker.isbn13()
+    return get_isbn_generator()()
     
 
 def random_book(pk: int = 1) -> dict:
     """
     Генерирует случайную книгу
     """    
+    corpus = get_corpus()
     while True:
         model = conf.MODEL
         pk = pk
-        title = random_title()
+        title = corpus.title()
         year = random.randint(1800, 2020)
         page = random.randint(2, 3000)
         isbn13 = random_isbn13()
@@ -154,14 +418,14 @@ def random_book(pk: int = 1) -> dict:
         price = round(random.uniform(1, 10000),2)
         discount = random.randint(1, 100)
         number_of_author = random.randint(1, 3)
-        author = random_author(number_of_author)
+        author = corpus.author(number_of_author)
 
         one_book = {"model": model,
                     "pk": pk,
                     "fields": {"title": title,
                                "year": year,
                                "pages": page,
-                               "isbn13": random_isbn13(),
+                               "isbn13": isbn13,
                                "rating": rating,
                                "price": price,
                                "discount": discount,
@@ -172,70 +436,858 @@ def random_book(pk: int = 1) -> dict:
         
         yield one_book
         pk += 1 
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Прибавляет время выполнения блока with к STAGE_TIMES[name].
+    Замер делается один раз на пакет, поэтому почти ничего не стоит
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_TIMES[name] += time.perf_counter() - start
+
+
+def book_batches(count: int,
+                 pk: int = 1,
+                 batch_size: int = BATCH_SIZE,
+                 rng: np.random.Generator = None,
+                 unique_isbn: bool = False,
+                 isbn_generator: Isbn13Generator = None,
+                 seed: int = None,
+                 number_of_author: int = None,
+                 zipf: float = None) -> Iterator[dict]:
+    """
+    Генерирует случайные книги пакетами в колоночном виде.
+
+    Все числовые поля пакета генерируются одним вызовом NumPy на колонку,
+    что убирает накладные расходы на десяток вызовов random.* на книгу.
+
+    Если задан seed, вместо rng используется PkRandom: поля книги зависят
+    только от seed и pk, а не от того, какие книги были сгенерированы раньше.
+    Результат не зависит ни от batch_size, ни от деления на процессы.
+
+    Parameters:
+    count: int - общее количество книг
+    pk: int - порядковый номер первой книги
+    batch_size: int - количество книг в одном пакете
+    rng: np.random.Generator - генератор случайных чисел
+    unique_isbn: bool - не повторять номера ISBN-13 внутри выборки
+    isbn_generator: Isbn13Generator - готовый генератор ISBN-13 вместо создаваемого из rng
+    seed: int - зерно для воспроизводимой генерации
+    number_of_author: int - количество авторов у каждой книги (по умолчанию от 1 до 3)
+    zipf: float - показатель распределения Ципфа для популярности авторов
+
+    Yields:
+    batch: dict - словарь "имя колонки -> список значений" длиной не больше batch_size
+    """
+    if batch_size < 1:
+        raise ValueError("Размер пакета должен быть положительным")
+    if rng is None:
+        rng = np.random.default_rng()
+    corpus = get_corpus()
+    if isbn_generator is None:
+        # Номер уникального ISBN-13 - это pk книги
+        isbn_generator = Isbn13Generator(rng if seed is None else seed,
+                                         unique=unique_isbn,
+                                         start=pk)
+
+    for start in range(pk, pk + count, batch_size):
+        size = min(batch_size, pk + count - start)
+        source = rng if seed is None else PkRandom(seed, np.arange(start, start + size))
+        
+        # Порядок вызовов source не менять: при заданном seed
+        # номер вызова определяет поле книги
+        with stage('random_fields'):
+            numbers_of_author = source.integers(1, 4, size)
+            if number_of_author is not None:
+                numbers_of_author = np.full(size, number_of_author)
+        with stage('random_title'):
+            title = corpus.title_batch(source, size)
+        with stage('random_fields'):
+            year = source.integers(1800, 2021, size).tolist()
+            pages = source.integers(2, 3001, size).tolist()
+        with stage('random_isbn13'):
+            isbn13 = isbn_generator.batch(size, source)
+        with stage('random_fields'):
+            rating = source.uniform(0, 5, size).round(1).tolist()
+            price = source.uniform(1, 10000, size).round(2).tolist()
+            discount = source.integers(1, 101, size).tolist()
+        with stage('random_author'):
+            author = corpus.author_batch(source, numbers_of_author, zipf)
+
+        yield {"pk": list(range(start, start + size)),
+               "title": title,
+               "year": year,
+               "pages": pages,
+               "isbn13": isbn13,
+               "rating": rating,
+               "price": price,
+               "discount": discount,
+               "author": author,
+        }
+
+
+def batch_to_books(batch: dict) -> list:
+    """
+    Собирает из колоночного пакета список книг в формате random_book()
+    """
+    model = conf.MODEL
+    return [{"model": model,
+             "pk": pk,
+             "fields": {"title": title,
+                        "year": year,
+                        "pages": pages,
+                        "isbn13": isbn13,
+                        "rating": rating,
+                        "price": price,
+                        "discount": discount,
+                        "author": author,
+             }
+            }
+            for pk, title, year, pages, isbn13, rating, price, discount, author
+            in zip(batch["pk"], batch["title"], batch["year"], batch["pages"],
+                   batch["isbn13"], batch["rating"], batch["price"],
+                   batch["discount"], batch["author"])]
+
+
+def books_from_batches(batches: Iterable) -> Iterator[dict]:
+    """
+    Книги из колоночных пакетов по одной (см. batch_to_books)
+    """
+    for batch in batches:
+        with stage('batch_to_books'):
+            books = batch_to_books(batch)
+        yield from books
+
+
+def generate_books(count: int,
+                   pk: int = 1,
+                   batch_size: int = BATCH_SIZE,
+                   rng: np.random.Generator = None,
+                   unique_isbn: bool = False,
+                   isbn_generator: Isbn13Generator = None,
+                   seed: int = None,
+                   number_of_author: int = None,
+                   zipf: float = None) -> Iterator[dict]:
+    """
+    Генерирует count случайных книг, начиная с номера pk.
+    Внутри книги создаются пакетами по batch_size штук (см. book_batches)
+    """
+    yield from books_from_batches(book_batches(count, pk, batch_size, rng, unique_isbn,
+                                               isbn_generator, seed, number_of_author, zipf))
         
         
-def create_json(output_file: str, result_books_list: list, indent: int) -> None:
+def with_extension(filename: str, extension: str) -> str:
+    """
+    Добавляет к имени файла расширение, если его там нет
+    """
+    if not filename.endswith(extension):
+        filename += extension
+    return filename
+
+
+def json_items(books: Iterable, indent: int) -> Iterator[str]:
     """
-    Записывает result_books_list в JSON файл
+    Кодирует книги в JSON по одной.
+    Каждая строка уже сдвинута так, как ее сдвинул бы json.dump()
+    внутри массива, поэтому строки остается только соединить
+    разделителем из json_separators().
+    """
+    if indent is None:
+        for book in books:
+            yield json.dumps(book, ensure_ascii=False)
+        return
+
+    # Внутри строк JSON переводы строк экранируются,
+    # поэтому "\n" встречается только между элементами разметки
+    shift = '\n' + ' ' * indent
+    for book in books:
+        yield ' ' * indent + json.dumps(book, indent=indent, ensure_ascii=False).replace('\n', shift)
+
+
+def json_separators(indent: int) -> tuple:
+    """
+    Открывающая скобка, разделитель элементов и закрывающая скобка
+    массива JSON в том виде, в каком их записывает json.dump()
+    """
+    if indent is None:
+        return '[', ', ', ']'
+    return '[\n', ',\n', '\n]'
+
+
+def write_buffered(file, pieces: Iterable, buffer_size: int = BUFFER_SIZE) -> None:
+    """
+    Записывает строки из pieces в file порциями по buffer_size строк,
+    чтобы в памяти не держалось больше одной порции
+    """
+    pieces = iter(pieces)
+    while True:
+        chunk = list(islice(pieces, buffer_size))
+        if not chunk:
+            break
+        file.write(''.join(chunk))
+
+
+def create_json(output_file: str, result_books_list: Iterable, indent: int) -> None:
+    """
+    Записывает result_books_list в JSON файл.
+    Книги кодируются и записываются по мере поступления, поэтому
+    result_books_list может быть генератором любой длины.
+    Результат совпадает с результатом json.dump()
     
     Parameters:
     output_file: str - имя файла, который будет сохранен
-    result_books_list: list - список словарей, с информацией о книгах
+    result_books_list: Iterable - книги (словари), например генератор generate_books()
     indent: int - параметр indent метода json.dump()
     """
-    if not output_file.endswith('.json'):
-        output_file += '.json'
-        
+    output_file = with_extension(output_file, '.json')
+
+    items = json_items(result_books_list, indent)
+    first = next(items, None)
+    
     with open(output_file, 'w') as file:
-        json.dump(result_books_list, 
-                  file, 
-                  indent=indent, 
-                  ensure_ascii=False) 
+        if first is None:
+            file.write('[]')
+            return
+
+        opening, separator, closing = json_separators(indent)
+        file.write(opening + first)
+        write_buffered(file, (separator + item for item in items))
+        file.write(closing)
         
 
+def csv_rows(books: Iterable) -> Iterator[tuple]:
+    """
+    Строки CSV в формате, который раньше давал pandas.DataFrame(books).set_index('pk'):
+    номер книги, модель и словарь fields
+    """
+    for book in books:
+        yield book["pk"], book["model"], str(book["fields"])
+
+
 def create_csv(output_file: str, 
-               result_books_list: list, 
+               result_books_list: Iterable, 
                delimiter: str,
                newline: str) -> None:
     """
-    Записывает result_books_list в CSV файл
+    Записывает result_books_list в CSV файл.
+    Строки записываются порциями по BUFFER_SIZE по мере поступления книг
     
     Parameters:
     output_file: str - имя файла, который будет сохранен
-    result_books_list: list - список словарей, с информацией о книгах 
+    result_books_list: Iterable - книги (словари), например генератор generate_books()
     delimiter: str - резделитель значений в строке
     newline: str - резделитель строк 
     """
-    if not output_file.endswith('.csv'):
-        output_file += '.csv'
+    output_file = with_extension(output_file, '.csv')
             
-    pd.DataFrame(result_books_list).set_index('pk').to_csv(output_file, 
-                                                           sep=delimiter, 
-                                                           line_terminator=newline)
+    rows = csv_rows(result_books_list)
+    with open(output_file, 'w', newline='') as file:
+        writer = csv.writer(file, delimiter=delimiter, lineterminator=newline)
+        writer.writerow(CSV_HEADER)
+        while True:
+            chunk = list(islice(rows, BUFFER_SIZE))
+            if not chunk:
+                break
+            writer.writerows(chunk)
     
     
-def main() -> None:
+def ndjson_filename(filename: str, compression: str) -> str:
     """
-    Основная функция программы 
+    Имя файла NDJSON с расширением .ndjson или, при сжатии, .ndjson.gz
+    """
+    if compression == 'gzip':
+        return filename if filename.endswith('.gz') else with_extension(filename, '.ndjson') + '.gz'
+    return with_extension(filename, '.ndjson')
+
+
+def open_ndjson(output_file: str, compression: str):
+    """
+    Открывает файл NDJSON на запись, при compression='gzip' - со сжатием
+    """
+    output_file = ndjson_filename(output_file, compression)
+    if compression == 'gzip':
+        return gzip.open(output_file, 'wt', newline='')
+    return open(output_file, 'w', newline='')
+
+
+def ndjson_lines(books: Iterable) -> Iterator[str]:
+    """
+    Книги в формате NDJSON: по одному компактному JSON-объекту в строке
+    """
+    for book in books:
+        yield json.dumps(book, ensure_ascii=False) + '\n'
+
+
+def create_ndjson(output_file: str, result_books_list: Iterable, compression: str) -> None:
+    """
+    Записывает result_books_list в NDJSON файл по мере поступления книг
+
+    Parameters:
+    output_file: str - имя файла, который будет сохранен
+    result_books_list: Iterable - книги (словари), например генератор generate_books()
+    compression: str - 'none' или 'gzip'
+    """
+    with open_ndjson(output_file, compression) as file:
+        write_buffered(file, ndjson_lines(result_books_list))
+
+
+def load_pyarrow(message: str) -> None:
+    """
+    Импортирует pyarrow в pa и pyarrow.parquet в pq, если они еще не импортированы
+
+    Parameters:
+    message: str - текст ImportError, если pyarrow не установлен
+    """
+    global pa, pq
+    if pa is not None:
+        return
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError(message) from None
+    # Первый pa.array() импортирует pandas, если он установлен (около 0,4 с).
+    # Пустой массив переносит этот импорт сюда, до начала генерации
+    pyarrow.array([])
+    pa, pq = pyarrow, pyarrow.parquet
+
+
+def arrow_schema():
+    """
+    Схема Arrow для книг: те же model/pk/fields, что и в JSON,
+    fields - структура, author - список строк
+    """
+    return pa.schema([
+        ('model', pa.string()),
+        ('pk', pa.int64()),
+        ('fields', pa.struct([
+            ('title', pa.string()),
+            ('year', pa.int16()),
+            ('pages', pa.int32()),
+            ('isbn13', pa.string()),
+            ('rating', pa.float64()),
+            ('price', pa.float64()),
+            ('discount', pa.int8()),
+            ('author', pa.list_(pa.string())),
+        ])),
+    ])
+
+
+def batch_to_arrow(batch: dict, schema):
+    """
+    Превращает колоночный пакет из book_batches() в pa.RecordBatch
+    без сборки словарей для отдельных книг
+    """
+    fields_type = schema.field('fields').type
+    fields = pa.StructArray.from_arrays(
+        [pa.array(batch[field.name], type=field.type) for field in fields_type],
+        fields=list(fields_type))
+
+    model = pa.array([conf.MODEL] * len(batch['pk']), type=pa.string())
+    return pa.RecordBatch.from_arrays([model, pa.array(batch['pk'], type=pa.int64()), fields],
+                                      schema=schema)
+
+
+def write_record_batches(command: str,
+                         output_file: str,
+                         record_batches: Iterable,
+                         compression: str) -> None:
+    """
+    Записывает pa.RecordBatch по одному в файл Parquet
+    (каждый пакет - отдельная группа строк) или Arrow IPC
+
+    Parameters:
+    command: str - 'parquet' или 'arrow'
+    output_file: str - имя файла, который будет сохранен
+    record_batches: Iterable - пакеты книг
+    compression: str - алгоритм сжатия или 'none'
+    """
+    load_pyarrow("Для форматов parquet и arrow нужен пакет pyarrow")
+
+    schema = arrow_schema()
+    compression = None if compression == 'none' else compression
+    if command == 'parquet':
+        writer = pq.ParquetWriter(with_extension(output_file, '.parquet'),
+                                  schema,
+                                  compression=compression or 'none')
+    else:
+        writer = pa.ipc.new_file(with_extension(output_file, '.arrow'),
+                                 schema,
+                                 options=pa.ipc.IpcWriteOptions(compression=compression))
+
+    with writer:
+        for record_batch in record_batches:
+            writer.write_batch(record_batch)
+
+
+def create_columnar(command: str,
+                    output_file: str,
+                    batches: Iterable,
+                    compression: str) -> None:
+    """
+    Записывает пакеты из book_batches() в файл Parquet или Arrow IPC.
+    В памяти одновременно находится только один пакет
+
+    Parameters:
+    command: str - 'parquet' или 'arrow'
+    output_file: str - имя файла, который будет сохранен
+    batches: Iterable - колоночные пакеты книг
+    compression: str - алгоритм сжатия или 'none'
+    """
+    load_pyarrow("Для форматов parquet и arrow нужен пакет pyarrow")
+
+    schema = arrow_schema()
+    write_record_batches(command, output_file,
+                         (batch_to_arrow(batch, schema) for batch in batches),
+                         compression)
+
+
+def sqlite_tables() -> tuple:
+    """
+    Имена таблиц так, как их назвал бы Django для модели conf.MODEL:
+    книги, авторы и связь многие-ко-многим между ними
+    """
+    app_label, model = conf.MODEL.split('.')
+    book_table = f'{app_label}_{model}'
+    return book_table, f'{app_label}_author', f'{book_table}_author'
+
+
+def check_sqlite_pk(output_file: str, pk: int, count: int) -> None:
+    """
+    Проверяет, что номера новых книг [pk, pk + count) еще не заняты
+    в существующей базе. Новые книги дописываются к старым, поэтому
+    при повторной записи в ту же базу --pk должен быть больше
+    номеров уже записанных книг.
+
+    Parameters:
+    output_file: str - файл базы данных
+    pk: int - номер первой книги
+    count: int - количество книг
+    """
+    if not os.path.exists(output_file):
+        return
+    book_table, _, _ = sqlite_tables()
+    connection = sqlite3.connect(output_file)
+    try:
+        exists = connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                    (book_table,)).fetchone()
+        if exists is None:
+            return
+        taken = connection.execute(f'SELECT 1 FROM {book_table} WHERE id >= ? AND id < ? LIMIT 1',
+                                   (pk, pk + count)).fetchone()
+        if taken is not None:
+            max_id, = connection.execute(f'SELECT MAX(id) FROM {book_table}').fetchone()
+            raise ValueError(f'В базе {output_file} уже есть книги с номерами из '
+                             f'[{pk}, {pk + count}): последний номер {max_id}, '
+                             f'для дописывания укажите --pk {max_id + 1}')
+    finally:
+        connection.close()
+
+
+def create_sqlite(output_file: str,
+                  batches: Iterable,
+                  transaction_size: int = TRANSACTION_SIZE) -> None:
+    """
+    Записывает пакеты из book_batches() в базу SQLite.
+
+    Каждый пакет вставляется тремя вызовами executemany (новые авторы,
+    книги, связи книга-автор), транзакция фиксируется раз в transaction_size
+    книг. Индекс по связям строится один раз после загрузки.
+    Журнал держится в памяти и синхронизация с диском отключена:
+    база предназначена для тестов, а не для хранения данных.
+
+    Parameters:
+    output_file: str - файл базы данных
+    batches: Iterable - колоночные пакеты книг
+    transaction_size: int - количество книг в одной транзакции
+    """
+    book_table, author_table, link_table = sqlite_tables()
+
+    connection = sqlite3.connect(output_file, isolation_level=None)
+    try:
+        connection.execute('PRAGMA synchronous = OFF')
+        connection.execute('PRAGMA journal_mode = MEMORY')
+        connection.execute(f'CREATE TABLE IF NOT EXISTS {book_table} ('
+                           'id INTEGER PRIMARY KEY, title TEXT NOT NULL, '
+                           'year INTEGER NOT NULL, pages INTEGER NOT NULL, '
+                           'isbn13 TEXT NOT NULL, rating REAL NOT NULL, '
+                           'price REAL NOT NULL, discount INTEGER NOT NULL)')
+        connection.execute(f'CREATE TABLE IF NOT EXISTS {author_table} ('
+                           'id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)')
+        connection.execute(f'CREATE TABLE IF NOT EXISTS {link_table} ('
+                           'id INTEGER PRIMARY KEY, '
+                           f'book_id INTEGER NOT NULL REFERENCES {book_table} (id), '
+                           f'author_id INTEGER NOT NULL REFERENCES {author_table} (id))')
+
+        # Имена уже известных авторов держим в памяти,
+        # чтобы не искать их в базе для каждой книги
+        author_ids = dict(connection.execute(f'SELECT name, id FROM {author_table}'))
+        next_author_id = max(author_ids.values(), default=0) + 1
+
+        connection.execute('BEGIN')
+        in_transaction = 0
+        for batch in batches:
+            new_authors = []
+            for name in dict.fromkeys(name for names in batch['author'] for name in names):
+                if name not in author_ids:
+                    author_ids[name] = next_author_id
+                    new_authors.append((next_author_id, name))
+                    next_author_id += 1
+
+            connection.executemany(f'INSERT INTO {author_table} (id, name) VALUES (?, ?)',
+                                   new_authors)
+            connection.executemany(f'INSERT INTO {book_table} '
+                                   '(id, title, year, pages, isbn13, rating, price, discount) '
+                                   'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                   zip(batch['pk'], batch['title'], batch['year'],
+                                       batch['pages'], batch['isbn13'], batch['rating'],
+                                       batch['price'], batch['discount']))
+            connection.executemany(f'INSERT INTO {link_table} (book_id, author_id) VALUES (?, ?)',
+                                   ((pk, author_ids[name])
+                                    for pk, names in zip(batch['pk'], batch['author'])
+                                    for name in names))
+
+            in_transaction += len(batch['pk'])
+            if in_transaction >= transaction_size:
+                connection.execute('COMMIT')
+                connection.execute('BEGIN')
+                in_transaction = 0
+
+        connection.execute('COMMIT')
+        connection.execute(f'CREATE INDEX IF NOT EXISTS {link_table}_book_id '
+                           f'ON {link_table} (book_id)')
+        connection.execute(f'CREATE INDEX IF NOT EXISTS {link_table}_author_id '
+                           f'ON {link_table} (author_id)')
+    finally:
+        connection.close()
+
+
+def arrow_to_batch(record_batch) -> dict:
+    """
+    Обратное к batch_to_arrow(): колоночный пакет в формате book_batches()
+    """
+    fields = record_batch.column('fields')
+    batch = {'pk': record_batch.column('pk').to_pylist()}
+    for field in fields.type:
+        batch[field.name] = fields.field(field.name).to_pylist()
+    return batch
+
+
+def output_filename(args) -> str:
+    """
+    Имя выходного файла для команды args.command (None для вывода на экран)
+    """
+    if args.command is None:
+        return None
+    filename = getattr(args, args.command + '_filename')
+    if args.command == 'ndjson':
+        return ndjson_filename(filename, args.compression)
+    if args.command == 'sqlite':
+        return filename
+    return with_extension(filename, '.' + args.command)
+
+
+def shard_ranges(count: int, pk: int, shards: int) -> list:
+    """
+    Делит книги с номерами [pk, pk + count) на shards непрерывных диапазонов
+
+    Returns:
+    list - список пар (номер первой книги диапазона, количество книг)
+    """
+    shards = max(1, min(shards, count))
+    size, rest = divmod(count, shards)
+    ranges = []
+    start = pk
+    for i in range(shards):
+        shard_size = size + (i < rest)
+        ranges.append((start, shard_size))
+        start += shard_size
+    return ranges
+
+
+def write_fragment(command: str, books: Iterable, file, options: dict) -> None:
+    """
+    Записывает книги одного диапазона в file в том же виде, в каком они
+    оказались бы в середине общего вывода команды command:
+    для JSON - элементы массива без скобок, для CSV - строки без заголовка
+    """
+    if command is None:
+        write_buffered(file, (str(book) + '\n' for book in books))
+    elif command == 'ndjson':
+        write_buffered(file, ndjson_lines(books))
+    elif command == 'json':
+        _, separator, _ = json_separators(options['indent'])
+        items = json_items(books, options['indent'])
+        write_buffered(file, (item if i == 0 else separator + item
+                              for i, item in enumerate(items)))
+    elif command == 'csv':
+        writer = csv.writer(file,
+                            delimiter=options['delimiter'],
+                            lineterminator=options['newline'])
+        rows = csv_rows(books)
+        while True:
+            chunk = list(islice(rows, BUFFER_SIZE))
+            if not chunk:
+                break
+            writer.writerows(chunk)
+
+
+def generate_shard(task: tuple) -> str:
+    """
+    Генерирует один диапазон книг в отдельном процессе
+    и записывает его во временный файл
+
+    Parameters:
+    task: tuple - (command, options, start, size, shard_seed, path)
+    start, size - номер первой книги и размер диапазона,
+    shard_seed - np.random.SeedSequence диапазона,
+    path - временный файл для результата
+
+    Returns:
+    tuple - (path, stage_times)
+    path: str - имя временного файла
+    stage_times: dict - время этапов генерации в этом процессе (см. STAGE_TIMES)
+    """
+    command, options, start, size, shard_seed, path = task
+    started = time.perf_counter()
+    STAGE_TIMES.clear()
+    rng = np.random.default_rng(shard_seed)
+    isbn_generator = None
+    if options['unique_isbn'] and options['seed'] is None:
+        # Все процессы берут номера из одной перестановки, каждый со своего места
+        isbn_generator = Isbn13Generator(options['isbn_seed'],
+                                         unique=True,
+                                         start=start)
+
+    batches = book_batches(size, start, options['batch_size'], rng,
+                           unique_isbn=options['unique_isbn'],
+                           isbn_generator=isbn_generator,
+                           seed=options['seed'],
+                           number_of_author=options['authors'],
+                           zipf=options['zipf'])
+
+    if command in COLUMNAR_COMMANDS or command == 'sqlite':
+        # Диапазон сохраняется несжатым потоком Arrow, сжимает пакеты
+        # (или вставляет их в базу) уже основной процесс.
+        # При запуске процессов через spawn pyarrow здесь еще не импортирован
+        load_pyarrow("Для форматов parquet и arrow нужен пакет pyarrow")
+        schema = arrow_schema()
+        with pa.ipc.new_stream(path, schema) as writer:
+            for batch in batches:
+                writer.write_batch(batch_to_arrow(batch, schema))
+    else:
+        with open(path, 'w', newline='') as file:
+            write_fragment(command, books_from_batches(batches), file, options)
+
+    return path, writer_time(time.perf_counter() - started)
+
+
+def collect_stage_times(results: Iterable) -> Iterator[str]:
+    """
+    Складывает время этапов из результатов generate_shard() в STAGE_TIMES
+    и возвращает имена временных файлов по порядку
+    """
+    for path, stage_times in results:
+        for name, seconds in stage_times.items():
+            STAGE_TIMES[name] += seconds
+        yield path
+
+
+def read_fragments(paths: Iterable) -> Iterator:
+    """
+    Пакеты pa.RecordBatch из временных файлов generate_shard() по порядку.
+    Прочитанный файл сразу удаляется
+    """
+    for path in paths:
+        with pa.ipc.open_stream(path) as reader:
+            yield from reader
+        os.remove(path)
+
+
+def create_parallel(args) -> None:
+    """
+    Генерирует args.count книг в args.workers процессах.
+
+    Книги делятся на непрерывные диапазоны номеров, начиная с args.pk.
+    Каждый диапазон генерируется со своим зерном (или, если задан args.seed,
+    из общего зерна и номеров книг) во временный файл,
+    затем файлы склеиваются в порядке номеров в один выходной файл
+    (или выводятся на экран).
     """
-    parser = create_parser()
-    args = parser.parse_args()
-    
-    count = args.count
     command = args.command
-    pk = args.pk
-    
-    book_gen = random_book(pk)
+    if command in COLUMNAR_COMMANDS:
+        load_pyarrow("Для форматов parquet и arrow нужен пакет pyarrow")
+    if command == 'sqlite':
+        load_pyarrow("Для записи в SQLite из нескольких процессов нужен пакет pyarrow")
+    options = {'indent': getattr(args, 'indent', None),
+               'delimiter': getattr(args, 'delimiter', ','),
+               'newline': getattr(args, 'newline', '\n'),
+               'batch_size': args.batch_size,
+               'unique_isbn': args.unique_isbn,
+               'seed': args.seed,
+               'authors': args.authors,
+               'zipf': args.zipf}
+
+    # Диапазонов больше, чем процессов, чтобы процессы загружались равномерно
+    ranges = shard_ranges(args.count, args.pk, args.workers * 4)
+    seed = np.random.SeedSequence()
+    options['isbn_seed'] = seed.spawn(1)[0]
+    shard_seeds = seed.spawn(len(ranges))
+
+    output_file = output_filename(args)
+    directory = os.path.dirname(os.path.abspath(output_file)) if output_file else None
+
+    with tempfile.TemporaryDirectory(dir=directory) as tmp_dir:
+        tasks = [(command, options, start, size, shard_seed,
+                  os.path.join(tmp_dir, f'{i}.part'))
+                 for i, ((start, size), shard_seed) in enumerate(zip(ranges, shard_seeds))]
+
+        with Pool(args.workers) as pool:
+            # imap возвращает результаты в порядке задач,
+            # поэтому диапазоны склеиваются в порядке номеров
+            fragments = collect_stage_times(pool.imap(generate_shard, tasks))
+
+            if command is None:
+                for path in fragments:
+                    with open(path, newline='') as fragment:
+                        shutil.copyfileobj(fragment, sys.stdout)
+                return
+
+            if command in COLUMNAR_COMMANDS:
+                write_record_batches(command, output_file,
+                                     read_fragments(fragments), args.compression)
+                return
+
+            if command == 'sqlite':
+                create_sqlite(output_file,
+                              (arrow_to_batch(record_batch)
+                               for record_batch in read_fragments(fragments)),
+                              args.transaction_size)
+                return
+
+            if command == 'ndjson':
+                file = open_ndjson(output_file, args.compression)
+            else:
+                file = open(output_file, 'w', newline='')
+
+            with file:
+                if command == 'json':
+                    opening, separator, closing = json_separators(options['indent'])
+                    if not ranges[0][1]:
+                        file.write('[]')
+                        return
+                    file.write(opening)
+                elif command == 'csv':
+                    csv.writer(file,
+                               delimiter=options['delimiter'],
+                               lineterminator=options['newline']).writerow(CSV_HEADER)
+
+                for i, path in enumerate(fragments):
+                    if command == 'json' and i:
+                        file.write(separator)
+                    with open(path, newline='') as fragment:
+                        shutil.copyfileobj(fragment, file)
+                    os.remove(path)
+
+                if command == 'json':
+                    file.write(closing)
+
+
+def writer_time(elapsed: float) -> dict:
+    """
+    Дополняет STAGE_TIMES временем записи: все, что за elapsed секунд
+    не ушло на этапы генерации
+
+    Returns:
+    dict - копия STAGE_TIMES
+    """
+    generation = sum(STAGE_TIMES[name] for name in GENERATION_STAGES)
+    STAGE_TIMES['writer'] += max(0.0, elapsed - generation)
+    return dict(STAGE_TIMES)
+
+
+def print_profile(elapsed: float, workers: int = 1) -> None:
+    """
+    Выводит в stderr время этапов, накопленное в STAGE_TIMES
+
+    Parameters:
+    elapsed: float - общее время работы в секундах
+    workers: int - количество процессов; при нескольких процессах
+    время этапов суммируется по всем процессам
+    """
+    total = sum(STAGE_TIMES.values()) or 1.0
+    lines = [f'{"Этап":<16}{"Время, с":>12}{"Доля":>8}']
+    for name in GENERATION_STAGES + ('writer',):
+        seconds = STAGE_TIMES[name]
+        lines.append(f'{name:<16}{seconds:>12.4f}{seconds / total:>8.1%}')
+    lines.append(f'{"Всего":<16}{elapsed:>12.4f}')
+    if workers > 1:
+        lines.append(f'Время этапов просуммировано по {workers} процессам')
+    print('\n'.join(lines), file=sys.stderr)
+
+
+def create_output(args) -> None:
+    """
+    Генерирует книги в одном процессе и выводит их в формате args.command
+    """
+    batches = book_batches(args.count, args.pk, args.batch_size,
+                           unique_isbn=args.unique_isbn,
+                           seed=args.seed,
+                           number_of_author=args.authors,
+                           zipf=args.zipf)
+    book_gen = books_from_batches(batches)
     
     if args.command == None:
-        for _ in range(count):
-            print(next(book_gen))
+        for book in book_gen:
+            print(book)
     elif args.command == 'json':
-        result_books_list = [next(book_gen) for _ in range(count)]
-        create_json(args.json_filename, result_books_list, args.indent)
+        create_json(args.json_filename, book_gen, args.indent)
     elif args.command == 'csv':
-        result_books_list = [next(book_gen) for _ in range(count)]
-        create_csv(args.csv_filename, result_books_list, args.delimiter, args.newline)
+        create_csv(args.csv_filename, book_gen, args.delimiter, args.newline)
+    elif args.command == 'ndjson':
+        create_ndjson(args.ndjson_filename, book_gen, args.compression)
+    elif args.command in COLUMNAR_COMMANDS:
+        create_columnar(args.command, output_filename(args), batches, args.compression)
+    elif args.command == 'sqlite':
+        create_sqlite(args.sqlite_filename, batches, args.transaction_size)
+
+
+def main() -> None:
+    """
+    Основная функция программы 
+    """
+    parser = create_parser()
+    args = parser.parse_args()
+    if args.authors is not None and args.authors < 1:
+        parser.error('-a/--authors должно быть не меньше 1')
+    if args.command == 'sqlite':
+        try:
+            check_sqlite_pk(args.sqlite_filename, args.pk, args.count)
+        except ValueError as error:
+            parser.error(str(error))
+    
+    # Импорт pyarrow не входит во время работы, которое выводит --profile
+    if args.command in COLUMNAR_COMMANDS:
+        load_pyarrow("Для форматов parquet и arrow нужен пакет pyarrow")
+    elif args.command == 'sqlite' and args.workers > 1:
+        load_pyarrow("Для записи в SQLite из нескольких процессов нужен пакет pyarrow")
+
+    start = time.perf_counter()
+    if args.workers > 1:
+        create_parallel(args)
+    else:
+        create_output(args)
+    elapsed = time.perf_counter() - start
+
+    if args.profile:
+        if args.workers == 1:
+            writer_time(elapsed)
+        print_profile(elapsed, args.workers)
 
 
 if __name__ == '__main__':
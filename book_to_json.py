@@ -1,7 +1,23 @@
 import re
 import os
+import io
+import glob
 import json
+import heapq
 import argparse
+from typing import Iterable, Iterator, TextIO
+from operator import itemgetter
+from itertools import islice
+from multiprocessing import util
+from concurrent.futures import ProcessPoolExecutor
+from book_cache import BlockCache, file_digest, CACHE_FILE, CACHE_SIZE
+
+# orjson кодирует JSON в несколько раз быстрее модуля json,
+# но необязателен: без него используется json
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Информация о каждой книге замкнута между #### и [Amazon.com]
 BOOK_PATTERN = re.compile(r'(?<=#### )(.*?)(?<=\[Amazon.com\])', re.DOTALL)
@@ -14,6 +30,22 @@ ITEMS_PATTERN = re.compile(r"(?P<position>^(?:\d{1,2}))\.\s+\["
                             "(?P<description>.*?)\"", 
                             flags=re.DOTALL | re.UNICODE)
 
+# Границы блока книги, которые ищет BOOK_PATTERN
+BLOCK_START = '#### '
+BLOCK_END = '[Amazon.com]'
+
+# Сколько символов читается из файла за один раз в потоковом режиме
+CHUNK_SIZE = 1 << 20
+
+# Сколько книг кодируется перед одной записью в файл
+BUFFER_SIZE = 1000
+
+# Форматы выходного файла
+FORMATS = ('json', 'ndjson')
+
+# Кэш, открытый в этом процессе (см. open_cache), или None
+process_cache = None
+
 
 def create_parser() -> None:
     """
@@ -23,20 +55,315 @@ def create_parser() -> None:
     output_name - имя файла, который будет сохранен в результате
     Если имя файла не задается пользователем, то файл будет называться
     также, как и файл, который подается на вход.
+    workers - количество процессов для разбора нескольких файлов
+    merge - записать книги из всех файлов в один JSON файл
+    top - записать только top самых популярных книг
+    format - json (массив, как у json.dump) или ndjson (книга в строке)
+    cache_file, cache_size, no_cache - кэш разобранных блоков (см. book_cache.py)
     """
     parser = argparse.ArgumentParser()
-    parser.add_argument('filename',
-                        help='Имя файла, который содержит список книг')
+    parser.add_argument('filenames',
+                        nargs='+',
+                        metavar='filename',
+                        help='Файлы со списком книг, папки или шаблоны вида pages/*.md')
     parser.add_argument('-i', '--indent',
                         type=int,
                         default=4,
                         help='Параметр отступа indent в JSON файле')
+    parser.add_argument('-f', '--format',
+                        choices=FORMATS,
+                        default='json',
+                        help='json - массив книг, ndjson - по одной книге в строке')
     parser.add_argument('-o','--output_name',
                         default='books',
                         help='Имя JSON файла')
+    parser.add_argument('-c', '--chunk_size',
+                        type=int,
+                        default=CHUNK_SIZE,
+                        help='Сколько символов читать из файла за один раз')
+    parser.add_argument('-p', '--pattern',
+                        default='*.md',
+                        help='Какие файлы брать из переданных папок')
+    parser.add_argument('-w', '--workers',
+                        type=int,
+                        default=os.cpu_count(),
+                        help='Количество процессов для разбора файлов')
+    parser.add_argument('-m', '--merge',
+                        action='store_true',
+                        default=False,
+                        help='Записать книги из всех файлов в один JSON файл (-o), '
+                             'отсортированный по recommended')
+    parser.add_argument('-t', '--top',
+                        type=int,
+                        default=None,
+                        help='Записать только top самых популярных книг')
+    parser.add_argument('--cache_file',
+                        default=CACHE_FILE,
+                        help='Файл кэша разобранных блоков')
+    parser.add_argument('--cache_size',
+                        type=float,
+                        default=CACHE_SIZE,
+                        help='Размер кэша в МБ; давно не использованные блоки удаляются')
+    parser.add_argument('--no-cache',
+                        dest='no_cache',
+                        action='store_true',
+                        default=False,
+                        help='Разбирать все блоки заново, не используя кэш. На множестве '
+                             'небольших файлов кэш почти не ускоряет разбор')
     return parser
 
 
+def iter_blocks(file: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """
+    Потоково разбивает текст на блоки книг - то же, что BOOK_PATTERN.findall(),
+    но без чтения всего файла в память.
+    
+    Файл читается кусками по chunk_size символов. Блок начинается сразу
+    после "#### " и заканчивается первым "[Amazon.com]" после него.
+    Незаконченный блок (или хвост, в котором может начинаться "#### ")
+    переносится в начало следующего куска, поэтому блоки на границе
+    кусков не теряются. В памяти держится один кусок и один блок.
+    
+    Parameters:
+    file: TextIO - открытый текстовый файл
+    chunk_size: int - сколько символов читать за один раз
+    
+    Yields:
+    block: str - текст одной книги
+    """
+    if chunk_size < 1:
+        raise ValueError("Размер куска должен быть положительным")
+    
+    buffer = ''
+    # С какого места искать конец незаконченного блока, чтобы
+    # не просматривать заново уже прочитанную часть длинного блока
+    resume = 0
+    for chunk in iter(lambda: file.read(chunk_size), ''):
+        buffer += chunk
+        position = 0
+        while True:
+            start = buffer.find(BLOCK_START, position)
+            if start == -1:
+                # "#### " может начинаться в последних символах куска
+                position = max(position, len(buffer) - len(BLOCK_START) + 1)
+                break
+            
+            start += len(BLOCK_START)
+            end = buffer.find(BLOCK_END, max(start, resume))
+            if end == -1:
+                # Конец блока еще не прочитан
+                position = start - len(BLOCK_START)
+                resume = len(buffer) - len(BLOCK_END) + 1 - position
+                break
+            
+            end += len(BLOCK_END)
+            yield buffer[start:end]
+            position = end
+            resume = 0
+        buffer = buffer[position:]
+
+
+def skip_space(text: str, i: int) -> int:
+    """
+    Индекс первого непробельного символа, начиная с i
+    """
+    n = len(text)
+    while i < n and text[i].isspace():
+        i += 1
+    return i
+
+
+def is_author_char(char: str) -> bool:
+    r"""
+    Символ из класса [\w\s'&\.] паттерна ITEMS_PATTERN
+    """
+    return char.isalnum() or char.isspace() or char in "_'&."
+
+
+def skip_digits(text: str, i: int) -> int:
+    """
+    Индекс первого символа, который не является цифрой, начиная с i
+    """
+    n = len(text)
+    while i < n and text[i].isdecimal():
+        i += 1
+    return i
+
+
+def tokenize_author(block: str, i: int) -> tuple:
+    """
+    Разбирает часть блока ") by Author (x.y% recommended)",
+    начинающуюся со скобки block[i]
+    
+    Returns:
+    tuple - (начало и конец автора, начало и конец рейтинга, 
+    индекс после "recommended)") или None, если формат не совпал
+    """
+    n = len(block)
+    
+    # ) by 
+    j = skip_space(block, i + 1)
+    if j == i + 1 or not block.startswith('by', j):
+        return None
+    author_start = skip_space(block, j + 2)
+    if author_start == j + 2:
+        return None
+    
+    # Author (
+    i = author_start
+    while i < n and is_author_char(block[i]):
+        i += 1
+    if i == n or block[i] != '(' or not block[i - 1].isspace():
+        return None
+    author_end = i - 1
+    
+    # Пробелы входят в класс символов автора, поэтому, если автор
+    # оказался пустым, ITEMS_PATTERN отдает ему пробел перед ним
+    author_start = min(author_start, author_end - 1)
+    if author_start <= j + 2:
+        return None
+    
+    # x.y% recommended)
+    recommended_start = i + 1
+    i = skip_digits(block, recommended_start)
+    if i - recommended_start > 3 or i == n or block[i] != '.':
+        return None
+    j = skip_digits(block, i + 1)
+    if j - i - 1 > 3 or j == n or block[j] != '%':
+        return None
+    # "(.% recommended)" ITEMS_PATTERN пропускает, но числом это не является
+    if j - recommended_start == 1:
+        return None
+    recommended_end = j
+    i = skip_space(block, j + 1)
+    if i == j + 1 or not block.startswith('recommended)', i):
+        return None
+    
+    return author_start, author_end, recommended_start, recommended_end, i + len('recommended)')
+
+
+def tokenize_block(block: str) -> dict:
+    """
+    Разбивает текст одной книги на категории за один линейный проход.
+    
+    Ищет те же поля, что и ITEMS_PATTERN:
+    N. [title](book_url) by Author (x.y% recommended) ... (cover_url) ... "description"
+    с помощью str.find/rfind вместо ленивых групп с DOTALL.
+    Результат совпадает с ITEMS_PATTERN, но вместо перебора всех
+    разбиений блока при ошибке каждый символ просматривается
+    ограниченное число раз, поэтому время работы - O(len(block)).
+    
+    Как и в ITEMS_PATTERN:
+    cover_url - содержимое последних скобок, закрывающихся
+    до предпоследней кавычки блока,
+    description - текст между двумя последними кавычками блока.
+    
+    position и recommended сразу переводятся в int и float,
+    чтобы не преобразовывать строки при каждом сравнении.
+    
+    Returns:
+    dict - словарь с ключами ITEMS_PATTERN или None, если блок не подходит
+    """
+    n = len(block)
+    
+    # N.
+    i = skip_digits(block, 0)
+    if not 1 <= i <= 2 or i >= n or block[i] != '.':
+        return None
+    position = int(block[:i])
+    
+    # пробелы и [title](
+    i = skip_space(block, i + 1)
+    if i == n or block[i] != '[' or not block[i - 1].isspace():
+        return None
+    book_start = i + 1
+    book_end = block.find('](', book_start + 1)
+    if book_end == -1:
+        return None
+    
+    # book_url) by Author (x.y% recommended)
+    # Если после ") by " не удалось разобрать автора и рейтинг, пробуем
+    # следующее ") by " - как и ITEMS_PATTERN, у которого book_url ленивая.
+    # Автор не может содержать ")", поэтому каждый символ просматривается
+    # не больше одного раза и проход остается линейным
+    url_start = book_end + 2
+    url_end = block.find(')', url_start + 1)
+    while url_end != -1:
+        fields = tokenize_author(block, url_end)
+        if fields is not None:
+            break
+        url_end = block.find(')', url_end + 1)
+    if url_end == -1:
+        return None
+    author_start, author_end, recommended_start, recommended_end, rest = fields
+    
+    # "description" - две последние кавычки
+    quote_end = block.rfind('"')
+    quote_start = block.rfind('"', 0, quote_end)
+    if quote_start == -1:
+        return None
+    
+    # (cover_url) - последние скобки, закрывающиеся до кавычек
+    cover_close = block.rfind(')', rest + 1, quote_start)
+    if cover_close == -1:
+        return None
+    cover_open = block.rfind('(', rest + 1, cover_close)
+    if cover_open == -1:
+        return None
+    cover_close = block.find(')', cover_open + 1)
+    
+    return {'position': position,
+            'book': block[book_start:book_end],
+            'book_url': block[url_start:url_end],
+            'author': block[author_start:author_end],
+            'recommended': float(block[recommended_start:recommended_end]),
+            'cover_url': block[cover_open + 1:cover_close],
+            'description': block[quote_start + 1:quote_end]}
+
+
+def parse_block(block: str) -> list:
+    """
+    Разбивает текст одной книги на категории (см. tokenize_block)
+    
+    Returns:
+    list - список словарей (пустой, если блок не совпал с форматом)
+    """
+    items = tokenize_block(block)
+    return [] if items is None else [items]
+
+
+def iter_file_blocks(filename: str, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """
+    iter_blocks() для файла filename: файл открывается при первом блоке
+    """
+    with open(filename, 'rt') as input_file:
+        yield from iter_blocks(input_file, chunk_size)
+
+
+def iter_books(file: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[dict]:
+    """
+    Потоковый парсер: словари с информацией о книгах
+    в порядке их следования в файле
+    """
+    for block in iter_blocks(file, chunk_size):
+        yield from parse_block(block)
+
+
+def sort_books(books, top: int = None) -> list:
+    """
+    Сортирует книги в порядке убывания их популярности по ключу 'recommended'
+    
+    Parameters:
+    books - словари с информацией о книгах (можно генератор)
+    top: int - оставить только top самых популярных книг. Они отбираются
+    кучей heapq.nlargest, поэтому в памяти держится не больше top книг,
+    а порядок такой же, как у первых top книг полного списка
+    """
+    if top is None:
+        return sorted(books, key=itemgetter('recommended'), reverse=True)
+    return heapq.nlargest(top, books, key=itemgetter('recommended'))
+
+
 def re_parser(text: str) -> list:
     """
     Парсер текста.    
@@ -52,60 +379,304 @@ def re_parser(text: str) -> list:
     Returns:
     result: list - список словарей, содержащих информацию о книгах.
     """
-    books_item_list = []
+    return sort_books(iter_books(io.StringIO(text)))
+
+
+def dumps_compact(book: dict) -> str:
+    """
+    Книга одной строкой JSON: через orjson, если он установлен
+    """
+    if orjson is not None:
+        return orjson.dumps(book).decode('utf-8')
+    return json.dumps(book, ensure_ascii=False)
+
+
+def json_items(books: Iterable, indent: int) -> Iterator[str]:
+    """
+    Кодирует книги в JSON по одной в том виде, в каком их
+    записал бы json.dump() внутри массива с отступом indent.
     
-    for book in BOOK_PATTERN.findall(text):
-        for items in ITEMS_PATTERN.finditer(book):
-            books_item_list.append(items.groupdict())
-            
-    result = sorted(books_item_list,  
-                    key=lambda x: float(x['recommended']), 
-                    reverse=True)
+    json.dumps() с indent кодирует на чистом Python. Словари книг плоские,
+    а переводы строк внутри строк JSON экранируются, поэтому нужные отступы
+    получаются из вывода быстрого кодировщика: orjson с отступом 2,
+    если он установлен, или кодировщика json на C с разделителем separators
+    """
+    if indent is None:
+        encode = json.JSONEncoder(ensure_ascii=False).encode
+        yield from map(encode, books)
+        return
+    
+    outer = ' ' * indent
+    inner = '\n' + outer * 2
+    if orjson is not None:
+        for book in books:
+            text = orjson.dumps(book, option=orjson.OPT_INDENT_2).decode('utf-8')
+            yield outer + text.replace('\n  ', inner).replace('\n}', '\n' + outer + '}')
+        return
     
-    return result
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(',' + inner, ': ')).encode
+    for book in books:
+        items = encode(book)[1:-1]
+        yield f'{outer}{{{inner}{items}\n{outer}}}' if items else outer + '{}'
 
 
-def create_json(output_filename: str, result_books_list: list, indent: int) -> None:
+def json_separators(indent: int) -> tuple:
+    """
+    Открывающая скобка, разделитель элементов и закрывающая скобка
+    массива JSON в том виде, в каком их записывает json.dump()
     """
-    Записывает result_books_list в JSON файл
+    if indent is None:
+        return '[', ', ', ']'
+    return '[\n', ',\n', '\n]'
+
+
+def write_buffered(file: TextIO, pieces: Iterable, buffer_size: int = BUFFER_SIZE) -> None:
+    """
+    Записывает строки из pieces в file порциями по buffer_size строк,
+    чтобы в памяти не держалось больше одной порции
+    """
+    pieces = iter(pieces)
+    while chunk := list(islice(pieces, buffer_size)):
+        file.write(''.join(chunk))
+
+
+def create_json(output_filename: str, result_books_list: Iterable, indent: int) -> None:
+    """
+    Записывает result_books_list в JSON файл.
+    Книги кодируются и записываются по мере поступления, поэтому
+    result_books_list может быть генератором, например из parse_merged().
+    Результат совпадает с результатом json.dump()
     
     Parameters:
     output_filename: str - имя файла, который будет сохранен
-    result_books_list: list - список словарей, с информацией о книгах
+    result_books_list: Iterable - словари с информацией о книгах
     indent: int - параметр indent метода json.dump()
     """
+    items = json_items(result_books_list, indent)
+    first = next(items, None)
+    
+    with open(output_filename, 'w') as file:
+        if first is None:
+            file.write('[]')
+            return
+        opening, separator, closing = json_separators(indent)
+        file.write(opening + first)
+        write_buffered(file, (separator + item for item in items))
+        file.write(closing)
+
+
+def create_ndjson(output_filename: str, result_books_list: Iterable) -> None:
+    """
+    Записывает result_books_list в NDJSON файл: по одной книге
+    в строке, в порядке поступления книг
+    """
     with open(output_filename, 'w') as file:
-        json.dump(result_books_list, file, indent=indent, ensure_ascii=False)      
-                     
+        write_buffered(file, (dumps_compact(book) + '\n' for book in result_books_list))
+
+
+def write_books(output_filename: str, result_books_list: Iterable,
+                output_format: str, indent: int) -> None:
+    """
+    Записывает книги в файл формата output_format (см. FORMATS)
+    """
+    if output_format == 'ndjson':
+        create_ndjson(output_filename, result_books_list)
+    else:
+        create_json(output_filename, result_books_list, indent)
         
+        
+def expand_inputs(names: list, pattern: str) -> list:
+    """
+    Превращает аргументы командной строки в список файлов:
+    из папок берутся файлы, подходящие под pattern,
+    шаблоны со звездочками раскрываются через glob.
+    Повторы убираются, порядок сохраняется.
+    """
+    filenames = []
+    for name in names:
+        if os.path.isdir(name):
+            filenames += sorted(path for path in glob.glob(os.path.join(name, pattern))
+                                if os.path.isfile(path))
+        elif not os.path.exists(name) and glob.has_magic(name):
+            filenames += sorted(glob.glob(name, recursive=True))
+        else:
+            filenames.append(name)
+    return list(dict.fromkeys(filenames))
+
+
+def json_filename(filename: str, output_format: str = 'json') -> str:
+    """
+    Имя выходного файла для входного файла: то же имя
+    с расширением выходного формата (.json или .ndjson)
+    """
+    name, ext = os.path.splitext(filename)
+    return f'{name}.{output_format}'
+
+
+def open_cache(cache: tuple) -> None:
+    """
+    Открывает кэш для всех файлов, которые разбирает этот процесс:
+    в главном процессе - один раз за запуск, в процессах пула -
+    как initializer. Соединение с базой не переживает fork, поэтому
+    пул создается до того, как кэш открыт в главном процессе.
+    
+    Parameters:
+    cache: tuple - (файл кэша, размер кэша в МБ) или None, чтобы не использовать кэш
+    """
+    global process_cache
+    process_cache = None if cache is None else BlockCache(*cache)
+
+
+def init_worker(cache: tuple) -> None:
+    """
+    initializer пула процессов. Пул не сообщает процессу, что задач больше
+    не будет, поэтому накопленные изменения записывает финализатор
+    multiprocessing при выходе процесса
+    """
+    open_cache(cache)
+    if process_cache is not None:
+        util.Finalize(process_cache, process_cache.close, exitpriority=0)
+
+
+def close_cache(cache: tuple) -> None:
+    """
+    В конце запуска удаляет лишние записи кэша (один раз на все файлы
+    и процессы) и закрывает кэш главного процесса
+    """
+    global process_cache
+    if cache is None:
+        return
+    block_cache = process_cache or BlockCache(*cache)
+    process_cache = None
+    with block_cache:
+        block_cache.flush()
+        block_cache.evict()
+
+
+def parse_file(filename: str, chunk_size: int = CHUNK_SIZE, top: int = None,
+               cache: BlockCache = None) -> list:
+    """
+    Разбирает один файл и сортирует книги по убыванию 'recommended'
+    (если задан top - только top самых популярных)
+    
+    Parameters:
+    cache: BlockCache - открытый кэш или None, чтобы не использовать кэш
+    """
+    if cache is None:
+        with open(filename, 'rt') as input_file:
+            return sort_books(iter_books(input_file, chunk_size), top)
+    
+    # Если файл найден в кэше, блоки не перебираются и файл не открывается
+    blocks = iter_file_blocks(filename, chunk_size)
+    return sort_books(cache.parse(blocks, parse_block, file_digest(filename)), top)
+
+
+def parse_cached(filename: str, chunk_size: int = CHUNK_SIZE, top: int = None) -> list:
+    """
+    parse_file() с кэшем этого процесса (см. open_cache)
+    """
+    return parse_file(filename, chunk_size, top, process_cache)
+
+
+def convert_file(task: tuple) -> int:
+    """
+    Разбирает один файл и записывает результат в свой JSON или NDJSON файл.
+    Выполняется в отдельном процессе, кэш - кэш этого процесса.
+    
+    Parameters:
+    task: tuple - (filename, output_filename, output_format, indent, chunk_size, top)
+    
+    Returns:
+    int - количество найденных книг
+    """
+    filename, output_filename, output_format, indent, chunk_size, top = task
+    result_books_list = parse_cached(filename, chunk_size, top)
+    write_books(output_filename, result_books_list, output_format, indent)
+    return len(result_books_list)
+
+
+def parse_merged(filenames: list, workers: int, chunk_size: int, top: int = None,
+                 cache: tuple = None) -> Iterator[dict]:
+    """
+    Разбирает файлы в workers процессах и сливает отсортированные
+    списки книг в один поток, отсортированный по убыванию 'recommended'.
+    Если задан top, каждый процесс возвращает только свои top книг,
+    а из слияния берутся первые top.
+    """
+    chunk_sizes = [chunk_size] * len(filenames)
+    tops = [top] * len(filenames)
+    if workers > 1 and len(filenames) > 1:
+        with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(cache,)) as executor:
+            sorted_lists = list(executor.map(parse_cached, filenames, chunk_sizes, tops))
+    else:
+        open_cache(cache)
+        sorted_lists = list(map(parse_cached, filenames, chunk_sizes, tops))
+    
+    merged = heapq.merge(*sorted_lists, key=itemgetter('recommended'), reverse=True)
+    return islice(merged, top)
+
+
 def main() -> None:
     """
     Парсер текста.
     Принимает агрументы командной строки.
-    Открывает и читает текст из файла.
+    Открывает файлы и потоково разбирает их кусками по chunk_size символов,
+    несколько файлов разбираются параллельно в workers процессах.
     Переименовывает выходной файл, если это нужно.
     """
     parser = create_parser()
     args = parser.parse_args()
-    filename = args.filename
     indent = args.indent
+    output_format = args.format
+    extension = '.' + output_format
     output_name = args.output_name
-                
-    with open(filename, 'rt') as input_file:
-        text = input_file.read()
-        
-        # Потому что необходимо записать .json файл
-        name, ext = os.path.splitext(filename)
-        output_filename = name + '.json'
-        
-        # Если пользователь ввел имя JSON-файла, то возьмем его
-        if output_name != 'books':
-            if not output_name.endswith('.json'):
-                output_name += '.json'
-            output_filename = output_name
-            
-        result_books_list = re_parser(text)
-        create_json(output_filename, result_books_list, indent)
+    workers = max(1, args.workers or 1)
+    top = args.top
+    if top is not None and top < 1:
+        parser.error('--top должен быть положительным')
+    if args.cache_size < 0:
+        parser.error('--cache_size не может быть отрицательным')
+    cache = None if args.no_cache else (args.cache_file, args.cache_size)
+    
+    filenames = expand_inputs(args.filenames, args.pattern)
+    if not filenames:
+        parser.error('не найдено ни одного файла со списком книг')
+    
+    # Если пользователь ввел имя JSON-файла, то возьмем его
+    if output_name != 'books' and not output_name.endswith(extension):
+        output_name += extension
+    
+    if args.merge:
+        # Для общего файла имя по умолчанию - books.json (books.ndjson)
+        if output_name == 'books':
+            output_name += extension
+        result_books_list = parse_merged(filenames, workers, args.chunk_size, top, cache)
+        write_books(output_name, result_books_list, output_format, indent)
+        close_cache(cache)
+        return
+    
+    if output_name != 'books' and len(filenames) > 1:
+        parser.error('имя JSON файла (-o) можно задать только для одного файла или вместе с --merge')
+    
+    # Потому что необходимо записать .json (.ndjson) файл
+    tasks = [(filename,
+              output_name if output_name != 'books' else json_filename(filename, output_format),
+              output_format,
+              indent,
+              args.chunk_size,
+              top)
+             for filename in filenames]
+    
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(cache,)) as executor:
+            # chunksize уменьшает накладные расходы, когда файлов тысячи
+            list(executor.map(convert_file, tasks,
+                              chunksize=max(1, len(tasks) // (workers * 4))))
+    else:
+        open_cache(cache)
+        for task in tasks:
+            convert_file(task)
+    close_cache(cache)
     
             
 if __name__ == '__main__':
@@ -113,4 +684,3 @@ if __name__ == '__main__':
         main()
     except FileNotFoundError:
         print('Вы пытаетесь открть несуществующий файл!')
-    
\ No newline at end of file
@@ -0,0 +1,352 @@
+import io
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+from typing import Callable
+from book_to_json import (BOOK_PATTERN, ITEMS_PATTERN, iter_blocks, tokenize_block,
+                          re_parser, parse_file)
+from book_cache import BlockCache
+
+# Скрипт, который запускает бенчмарк files
+BOOK_TO_JSON = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'book_to_json.py')
+
+# Названия книг и имена авторов берутся из генератора книг
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'book_generator')
+
+# Испорченные блоки, на которых ленивые группы с DOTALL
+# перебирают все разбиения текста. n - число повторов фрагмента
+PATHOLOGICAL = {
+    # нет закрывающей скобки book_url
+    'brackets': lambda n: '1. [' + 'a](' * n,
+    # длинный автор и много скобок, но нет кавычек описания
+    'author': lambda n: '1. [t](u) by ' + 'a ' * n + '(1.0% recommended)' + '(c)' * n,
+    # много скобок cover_url, но нет кавычек описания
+    'no_quotes': lambda n: '1. [t](u) by A (1.0% recommended) ' + '(c) ' * n,
+    # страница, где у блоков нет [Amazon.com]
+    'no_end': lambda n: '#### 1. [t](u) ' * n,
+}
+
+# Функции разбора: регулярные выражения и линейный токенизатор
+PARSERS = {
+    'brackets': (ITEMS_PATTERN.findall, tokenize_block),
+    'author': (ITEMS_PATTERN.findall, tokenize_block),
+    'no_quotes': (ITEMS_PATTERN.findall, tokenize_block),
+    'no_end': (BOOK_PATTERN.findall, lambda text: list(iter_blocks(io.StringIO(text)))),
+}
+
+
+def regex_parser(filename: str, cache_file: str) -> int:
+    """
+    Прежний разбор: весь файл в памяти, BOOK_PATTERN и ITEMS_PATTERN,
+    сортировка с float() в ключе
+    """
+    with open(filename) as file:
+        text = file.read()
+    books = [match.groupdict() for block in BOOK_PATTERN.findall(text)
+             for match in ITEMS_PATTERN.finditer(block)]
+    return len(sorted(books, key=lambda x: float(x['recommended']), reverse=True))
+
+
+def tokenizer_parser(filename: str, cache_file: str) -> int:
+    """
+    Токенизатор, весь файл в памяти (re_parser)
+    """
+    with open(filename) as file:
+        return len(re_parser(file.read()))
+
+
+def cached_parser(filename: str, cache_file: str) -> int:
+    """
+    parse_file() с кэшем, как в book_to_json.py: кэш открывается
+    на весь прогон, лишние записи удаляются в конце
+    """
+    with BlockCache(cache_file, 2**20) as block_cache:
+        count = len(parse_file(filename, cache=block_cache))
+        block_cache.flush()
+        block_cache.evict()
+    return count
+
+
+# Способы разбора для throughput: функция (имя файла, файл кэша) -> число книг
+MODES = {
+    'regex': regex_parser,
+    'tokenizer': tokenizer_parser,
+    'stream': lambda filename, cache_file: len(parse_file(filename)),
+    'top': lambda filename, cache_file: len(parse_file(filename, top=10)),
+    # Первый запуск заполняет кэш, второй берет из него все книги
+    'cache_cold': lambda filename, cache_file: cached_parser(filename, cache_file),
+    'cache_warm': lambda filename, cache_file: cached_parser(filename, cache_file),
+}
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """
+    Парсер аргументов командной строки
+    """
+    parser = argparse.ArgumentParser(description='Бенчмарки разбора book_to_json.py')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    pathological_parser = subparsers.add_parser('pathological',
+                                                help='Время разбора испорченных блоков: '
+                                                     'регулярные выражения и токенизатор')
+    pathological_parser.add_argument('-c', '--cases',
+                                     nargs='+',
+                                     choices=list(PATHOLOGICAL),
+                                     default=list(PATHOLOGICAL),
+                                     help='Виды испорченных блоков')
+    pathological_parser.add_argument('-n', '--sizes',
+                                     type=int,
+                                     nargs='+',
+                                     default=[250, 500, 1000, 2000, 4000, 8000, 16000],
+                                     help='Количество повторов фрагмента в блоке')
+    pathological_parser.add_argument('-l', '--limit',
+                                     type=float,
+                                     default=5.0,
+                                     help='Если регулярное выражение работало дольше limit '
+                                          'секунд, на больших блоках оно не запускается')
+
+    throughput_parser = subparsers.add_parser('throughput',
+                                              help='Скорость и память разбора '
+                                                   'сгенерированных списков книг')
+    throughput_parser.add_argument('-s', '--sizes',
+                                   type=float,
+                                   nargs='+',
+                                   default=[0.01, 1, 10, 100],
+                                   help='Размеры файлов со списком книг в МБ')
+    throughput_parser.add_argument('-m', '--modes',
+                                   nargs='+',
+                                   choices=list(MODES),
+                                   default=list(MODES),
+                                   help='Способы разбора')
+    throughput_parser.add_argument('--seed',
+                                   type=int,
+                                   default=0,
+                                   help='Зерно, чтобы файлы были одинаковыми')
+
+    files_parser = subparsers.add_parser('files',
+                                         help='Время запуска book_to_json.py на папке '
+                                              'с множеством файлов без кэша и с кэшем')
+    files_parser.add_argument('-n', '--count',
+                              type=int,
+                              nargs='+',
+                              default=[1000, 200],
+                              help='Количество файлов')
+    files_parser.add_argument('-s', '--sizes',
+                              type=float,
+                              nargs='+',
+                              default=[3, 100],
+                              help='Размер каждого файла в КБ (по одному на каждое -n)')
+    files_parser.add_argument('-w', '--workers',
+                              type=int,
+                              default=1,
+                              help='Количество процессов book_to_json.py')
+    files_parser.add_argument('--seed',
+                              type=int,
+                              default=0,
+                              help='Зерно, чтобы файлы были одинаковыми')
+
+    # Один прогон в отдельном процессе, его вызывает throughput
+    run_parser = subparsers.add_parser('run')
+    run_parser.add_argument('mode', choices=list(MODES))
+    run_parser.add_argument('filename')
+    run_parser.add_argument('cache_file')
+    return parser
+
+
+def measure(function: Callable, text: str) -> float:
+    """
+    Время одного вызова function(text) в секундах
+    """
+    start = time.perf_counter()
+    function(text)
+    return time.perf_counter() - start
+
+
+def pathological(args: argparse.Namespace) -> None:
+    """
+    Для каждого вида испорченного блока выводит время разбора
+    регулярным выражением и токенизатором при росте размера блока
+    """
+    print(f'{"Блок":<12}{"Повторов":>10}{"Символов":>12}{"Regex, с":>12}{"Токенизатор, с":>16}')
+    for case in args.cases:
+        regex, tokenizer = PARSERS[case]
+        regex_too_slow = False
+        for size in args.sizes:
+            text = PATHOLOGICAL[case](size)
+
+            if regex_too_slow:
+                regex_time = '-'
+            else:
+                elapsed = measure(regex, text)
+                regex_too_slow = elapsed > args.limit
+                regex_time = f'{elapsed:.4f}'
+
+            print(f'{case:<12}{size:>10}{len(text):>12}{regex_time:>12}'
+                  f'{measure(tokenizer, text):>16.4f}', flush=True)
+
+
+def read_lines(filename: str) -> list:
+    """
+    Непустые строки файла из папки генератора книг
+    """
+    with open(os.path.join(CORPUS_DIR, filename), encoding='utf-8') as file:
+        return [line.strip() for line in file if line.strip()]
+
+
+def create_corpus(filename: str, size: int, seed: int = 0) -> int:
+    """
+    Записывает список книг в формате, который разбирает book_to_json.py:
+    #### N. [title](url) by Author (x% recommended) ... "description" ... [Amazon.com]
+    Блоки пишутся по одному, поэтому файл может быть любого размера.
+
+    Parameters:
+    filename: str - имя файла
+    size: int - размер файла в байтах (последний блок может выйти за него)
+    seed: int - зерно генерации
+
+    Returns:
+    int - количество книг
+    """
+    rng = random.Random(seed)
+    titles = read_lines('books.txt')
+    authors = read_lines('authors.txt')
+
+    count = 0
+    written = 0
+    with open(filename, 'w', encoding='utf-8') as file:
+        while written < size:
+            count += 1
+            title = rng.choice(titles)
+            description = ' '.join(rng.choices(title.split() + rng.choice(titles).split(), k=12))
+            block = (f'#### {rng.randint(1, 99)}. [{title}](https://www.amazon.com/dp/{count}) '
+                     f'by {rng.choice(authors)} ({rng.uniform(0, 100):.1f}% recommended)\n\n'
+                     f'![{title}](https://images.example.com/{count}.jpg)\n\n'
+                     f'"{description}"\n\n'
+                     f'[Amazon.com](https://www.amazon.com/dp/{count})\n\n')
+            file.write(block)
+            written += len(block.encode('utf-8'))
+    return count
+
+
+def peak_memory(rusage) -> float:
+    """
+    Пиковый размер резидентной памяти процесса в МБ
+    (ru_maxrss в Linux - в КБ, в macOS - в байтах)
+    """
+    if sys.platform == 'darwin':
+        return rusage.ru_maxrss / 2**20
+    return rusage.ru_maxrss / 2**10
+
+
+def run_mode(mode: str, filename: str, cache_file: str) -> tuple:
+    """
+    Один прогон разбора в отдельном процессе, чтобы пиковая память
+    не зависела от предыдущих прогонов. Время разбора измеряет сам процесс
+    и выводит его в stdout: запуск интерпретатора и импорт модулей
+    на небольших файлах дольше самого разбора
+
+    Returns:
+    tuple - (время в секундах, пиковая память в МБ)
+    """
+    command = [sys.executable, os.path.abspath(__file__), 'run', mode, filename, cache_file]
+    process = subprocess.Popen(command, cwd=os.path.dirname(os.path.abspath(__file__)),
+                               stdout=subprocess.PIPE, text=True)
+    output = process.stdout.read()
+    process.stdout.close()
+    _, status, rusage = os.wait4(process.pid, 0)
+    # Popen не знает, что процесс уже завершен, и иначе ждал бы его в __del__
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    if process.returncode != 0:
+        raise RuntimeError(f"Прогон завершился с ошибкой: {' '.join(command)}")
+    return float(output), peak_memory(rusage)
+
+
+def throughput(args: argparse.Namespace) -> None:
+    """
+    Для каждого размера файла и способа разбора выводит время,
+    МБ/с, книг/с и пиковую память процесса
+    """
+    print(f'{"Способ":<12}{"МБ":>10}{"Книг":>12}{"Время, с":>10}'
+          f'{"МБ/с":>10}{"Книг/с":>12}{"Память, МБ":>13}')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in args.sizes:
+            filename = os.path.join(tmp_dir, 'books.md')
+            cache_file = os.path.join(tmp_dir, 'cache.sqlite3')
+            count = create_corpus(filename, int(size * 2**20), args.seed)
+            megabytes = os.path.getsize(filename) / 2**20
+
+            for mode in args.modes:
+                elapsed, memory = run_mode(mode, filename, cache_file)
+                print(f'{mode:<12}{megabytes:>10.2f}{count:>12}{elapsed:>10.4f}'
+                      f'{megabytes / elapsed:>10.1f}{count / elapsed:>12,.0f}'
+                      f'{memory:>13.1f}', flush=True)
+
+            for name in os.listdir(tmp_dir):
+                os.remove(os.path.join(tmp_dir, name))
+
+
+def run_book_to_json(directory: str, workers: int, options: list) -> float:
+    """
+    Время одного запуска book_to_json.py на папке в секундах
+    """
+    command = [sys.executable, BOOK_TO_JSON, directory, '-w', str(workers)] + options
+    start = time.perf_counter()
+    subprocess.run(command, check=True, cwd=os.path.dirname(BOOK_TO_JSON))
+    return time.perf_counter() - start
+
+
+def many_files(args: argparse.Namespace) -> None:
+    """
+    Ночной перезапуск на папке с множеством страниц: время book_to_json.py
+    без кэша, с пустым кэшем и повторно с заполненным кэшем.
+    Время включает запуск интерпретатора, как у настоящего запуска
+    """
+    if len(args.count) != len(args.sizes):
+        raise ValueError("Для каждого количества файлов нужен свой размер")
+    print(f'{"Файлов":>8}{"КБ":>8}{"Без кэша, с":>14}{"Пустой кэш, с":>16}{"Заполненный, с":>17}')
+    for count, size in zip(args.count, args.sizes):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            directory = os.path.join(tmp_dir, 'pages')
+            os.mkdir(directory)
+            for number in range(count):
+                create_corpus(os.path.join(directory, f'page{number}.md'),
+                              int(size * 2**10), args.seed + number)
+            cache_options = ['--cache_file', os.path.join(tmp_dir, 'cache.sqlite3')]
+
+            # Прогрев: первый запуск читает файлы с диска, а не из памяти ОС
+            run_book_to_json(directory, args.workers, ['--no-cache'])
+            times = [run_book_to_json(directory, args.workers, options)
+                     for options in (['--no-cache'], cache_options, cache_options)]
+            print(f'{count:>8}{size:>8g}{times[0]:>14.2f}{times[1]:>16.2f}{times[2]:>17.2f}',
+                  flush=True)
+
+
+def main() -> None:
+    """
+    pathological - испорченные блоки, throughput - сгенерированные списки книг,
+    files - множество файлов без кэша и с кэшем
+    """
+    args = create_parser().parse_args()
+    if args.command == 'pathological':
+        pathological(args)
+    elif args.command == 'throughput':
+        throughput(args)
+    elif args.command == 'files':
+        many_files(args)
+    else:
+        start = time.perf_counter()
+        count = MODES[args.mode](args.filename, args.cache_file)
+        elapsed = time.perf_counter() - start
+        if count == 0:
+            raise ValueError("Не найдено ни одной книги")
+        # Время разбора для run_mode
+        print(elapsed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,342 @@
+import math
+import time
+import random
+from typing import List, Tuple
+from tic_tac_toe_engine import Bitboard, PLAYER_INDEX
+
+# Оценка выигранной позиции. К ней прибавляется количество свободных
+# клеток, чтобы быстрая победа была лучше долгой
+WIN = 1 << 40
+INFINITY = 1 << 50
+
+# Виды оценок в таблице транспозиций
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Сколько секунд компьютер думает над ходом
+TIME_LIMIT = 1.0
+
+# Через сколько позиций проверяется, не вышло ли время
+CHECK_EVERY = 1024
+
+# Когда таблица транспозиций становится больше, она очищается
+MAX_TABLE_SIZE = 2_000_000
+
+
+class SearchTimeout(Exception):
+    """
+    Время или позиции, отведенные на ход, закончились
+    """
+
+
+def symmetries(size: int) -> List[Tuple[int, ...]]:
+    """
+    Восемь симметрий квадратного поля: четыре поворота и четыре отражения.
+
+    Parameters
+    ----------
+    size: int
+        Размер поля
+
+    Returns
+    -------
+    List[Tuple[int, ...]]
+        Перестановки клеток: symmetries(size)[s][cell] - куда симметрия s
+        переводит клетку cell. Первая перестановка тождественная
+    """
+    n = size - 1
+    permutations = [[0] * (size * size) for _ in range(8)]
+    for cell in range(size * size):
+        row, col = divmod(cell, size)
+        images = ((row, col), (col, n - row), (n - row, n - col), (n - col, row),
+                  (row, n - col), (n - row, col), (col, row), (n - col, n - row))
+        for permutation, (image_row, image_col) in zip(permutations, images):
+            permutation[cell] = image_row * size + image_col
+    return [tuple(permutation) for permutation in permutations]
+
+
+class ComputerPlayer:
+    """
+    Компьютерный игрок: negamax с альфа-бета отсечением.
+
+    Позиции, которые уже встречались, берутся из таблицы транспозиций.
+    Ключ таблицы - хэш Зобриста поля, приведенного к каноническому виду:
+    хэши всех восьми симметричных полей обновляются при каждом ходе
+    (по одному XOR на симметрию), а ключом служит наименьший из них.
+    Поэтому симметричные позиции считаются один раз, а лучший ход
+    хранится в координатах канонического поля.
+
+    Глубина поиска растет на единицу, пока не закончится time_limit
+    или не будет просмотрено max_nodes позиций (iterative deepening). Если до конца партии перебор не доходит,
+    позиция оценивается по открытым линиям. Поле 3×3 перебирается
+    до конца за доли секунды.
+    """
+
+    def __init__(self, size: int = 3, k: int = None, time_limit: float = TIME_LIMIT,
+                 seed: int = 0, max_nodes: int = None) -> None:
+        """
+        Parameters
+        ----------
+        size: int
+            Размер поля
+        k: int
+            Сколько символов подряд нужно для победы (по умолчанию size)
+        time_limit: float
+            Сколько секунд можно думать над ходом (None - без ограничения)
+        seed: int
+            Зерно для ключей Зобриста
+        max_nodes: int
+            Сколько позиций можно просмотреть за ход (None - без ограничения).
+            В отличие от time_limit не зависит от загрузки процессора,
+            поэтому с time_limit=None ходы воспроизводимы
+        """
+        self.size = size
+        self.k = size if k is None else k
+        self.time_limit = time_limit
+        self.max_nodes = max_nodes
+        self.board = Bitboard(size, self.k)
+        self.symmetries = symmetries(size)
+        self.inverse = []
+        for permutation in self.symmetries:
+            inverse = [0] * len(permutation)
+            for cell, image in enumerate(permutation):
+                inverse[image] = cell
+            self.inverse.append(tuple(inverse))
+
+        # zobrist[s][player][cell] - ключ клетки cell игрока player
+        # на поле, к которому применена симметрия s
+        rng = random.Random(seed)
+        keys = [[rng.getrandbits(64) for _ in range(size * size)] for _ in range(2)]
+        self.zobrist = [[[keys[player][permutation[cell]] for cell in range(size * size)]
+                         for player in range(2)]
+                        for permutation in self.symmetries]
+        self.hashes = [0] * 8
+
+        # Сначала клетки, через которые проходит больше линий (центр)
+        center = (size - 1) / 2
+        self.order = sorted(range(size * size),
+                            key=lambda cell: (-len(self.board.cell_masks[cell]),
+                                              abs(cell // size - center) + abs(cell % size - center)))
+        self.table = {}
+        self.nodes = 0
+        self.node_limit = 0
+        self.deadline = 0.0
+
+    def play(self, cell: int, player: int) -> bool:
+        """
+        Ход на поле поиска с обновлением хэшей
+
+        Returns
+        -------
+        bool
+            Выиграл ли player этим ходом
+        """
+        hashes = self.hashes
+        for s, zobrist in enumerate(self.zobrist):
+            hashes[s] ^= zobrist[player][cell]
+        return self.board.play(cell, player)
+
+    def undo(self, cell: int, player: int) -> None:
+        """
+        Отмена хода play()
+        """
+        hashes = self.hashes
+        for s, zobrist in enumerate(self.zobrist):
+            hashes[s] ^= zobrist[player][cell]
+        self.board.undo(cell, player)
+
+    def evaluate(self, player: int) -> int:
+        """
+        Оценка позиции без перебора для игрока player: линии, на которых
+        есть только его символы, минус линии только с символами соперника.
+        Чем больше символов на линии, тем больше ее вес
+        """
+        mine = self.board.boards[player]
+        theirs = self.board.boards[1 - player]
+        score = 0
+        for mask in self.board.masks:
+            if not mask & theirs:
+                score += 1 << 2 * (mask & mine).bit_count()
+            elif not mask & mine:
+                score -= 1 << 2 * (mask & theirs).bit_count()
+        return score
+
+    def negamax(self, depth: int, alpha: int, beta: int, player: int, empty: int) -> int:
+        """
+        Оценка позиции для игрока player, который сейчас ходит
+
+        Parameters
+        ----------
+        depth: int
+            Сколько еще ходов перебирать
+        alpha, beta: int
+            Окно альфа-бета отсечения
+        player: int
+            Чей ход: 0 - X, 1 - O
+        empty: int
+            Количество свободных клеток
+
+        Returns
+        -------
+        int
+            WIN + свободные клетки, если player выигрывает,
+            минус столько же, если проигрывает, 0 - ничья,
+            иначе оценка evaluate() на глубине depth
+        """
+        self.nodes += 1
+        if self.nodes % CHECK_EVERY == 0 and (time.perf_counter() > self.deadline
+                                              or self.nodes >= self.node_limit):
+            raise SearchTimeout
+        # Глубже конца партии перебирать нечего
+        depth = min(depth, empty)
+
+        hashes = self.hashes
+        key = min(hashes)
+        symmetry = hashes.index(key)
+        moves = self.order
+        entry = self.table.get(key)
+        if entry is not None:
+            entry_depth, entry_score, entry_flag, entry_move = entry
+            if entry_depth >= depth:
+                if entry_flag == EXACT:
+                    return entry_score
+                if entry_flag == LOWER:
+                    alpha = max(alpha, entry_score)
+                else:
+                    beta = min(beta, entry_score)
+                if alpha >= beta:
+                    return entry_score
+            # Лучший ход прошлого перебора - первым
+            best_cell = self.inverse[symmetry][entry_move]
+            moves = [best_cell] + [cell for cell in moves if cell != best_cell]
+
+        if depth == 0:
+            return self.evaluate(player)
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = -1
+        occupied = self.board.occupied
+        for cell in moves:
+            if occupied >> cell & 1:
+                continue
+            if self.play(cell, player):
+                score = WIN + empty - 1
+            elif empty == 1:
+                score = 0
+            else:
+                score = -self.negamax(depth - 1, -beta, -alpha, 1 - player, empty - 1)
+            self.undo(cell, player)
+
+            if score > best_score:
+                best_score = score
+                best_move = cell
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        if best_score <= original_alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table[key] = (depth, best_score, flag, self.symmetries[symmetry][best_move])
+        return best_score
+
+    def search_root(self, depth: int, player: int, empty: int, first: int) -> Tuple[int, int]:
+        """
+        Перебор первого хода с полным окном. Границы оценок из таблицы
+        здесь не используются: при суженном окне ход с лучшей оценкой
+        может оказаться не лучшим ходом
+
+        Parameters
+        ----------
+        first: int
+            Ход, который перебирается первым (лучший на прошлой глубине)
+
+        Returns
+        -------
+        Tuple[int, int]
+            (оценка позиции, лучший ход)
+        """
+        occupied = self.board.occupied
+        moves = [first] + [cell for cell in self.order if cell != first]
+        alpha = -INFINITY
+        best_move = first
+        for cell in moves:
+            if occupied >> cell & 1:
+                continue
+            if self.play(cell, player):
+                score = WIN + empty - 1
+            elif empty == 1:
+                score = 0
+            else:
+                score = -self.negamax(depth - 1, -INFINITY, -alpha, 1 - player, empty - 1)
+            self.undo(cell, player)
+            if score > alpha:
+                alpha = score
+                best_move = cell
+        return alpha, best_move
+
+    def best_move(self, board: Bitboard, player: int) -> int:
+        """
+        Лучший ход, найденный за time_limit секунд и max_nodes позиций
+
+        Parameters
+        ----------
+        board: Bitboard
+            Текущее поле
+        player: int
+            Чей ход: 0 - X, 1 - O
+
+        Returns
+        -------
+        int
+            Индекс клетки (номер клетки минус 1)
+        """
+        empty_cells = board.empty_cells()
+        if not empty_cells:
+            raise ValueError('На поле нет свободных клеток')
+        if len(self.table) > MAX_TABLE_SIZE:
+            self.table.clear()
+
+        self.board = board.copy()
+        self.hashes = [0] * 8
+        for owner, bits in enumerate(board.boards):
+            for cell in range(self.size * self.size):
+                if bits >> cell & 1:
+                    for s, zobrist in enumerate(self.zobrist):
+                        self.hashes[s] ^= zobrist[owner][cell]
+
+        self.deadline = math.inf if self.time_limit is None else time.perf_counter() + self.time_limit
+        self.node_limit = math.inf if self.max_nodes is None else self.nodes + self.max_nodes
+        empty = len(empty_cells)
+        move = next(cell for cell in self.order if cell in empty_cells)
+        for depth in range(1, empty + 1):
+            try:
+                score, move = self.search_root(depth, player, empty, move)
+            except SearchTimeout:
+                break
+            # Исход партии известен, глубже искать незачем
+            if abs(score) >= WIN:
+                break
+        return move
+
+    def choose(self, board_matrix: List[str], user: str) -> int:
+        """
+        Ход компьютера для tic()
+
+        Parameters
+        ----------
+        board_matrix: List[str]
+            Поле в виде списка "X", "O" и " "
+        user: str
+            Символ компьютера
+
+        Returns
+        -------
+        int
+            Номер клетки (от 1 до size*size)
+        """
+        board = Bitboard.from_matrix(board_matrix, self.k)
+        return self.best_move(board, PLAYER_INDEX[user]) + 1
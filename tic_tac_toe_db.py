@@ -0,0 +1,199 @@
+import os
+import mmap
+import argparse
+from typing import Dict, List, Tuple
+from tic_tac_toe_engine import Bitboard
+
+# Файл с решенными позициями поля 3×3
+DB_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tic_tac_toe_3x3.bin')
+
+SIZE = 3
+
+# Одна запись (байт) на каждое заполнение поля: 3**9 = 19683 байта
+TABLE_SIZE = 3 ** (SIZE * SIZE)
+
+# Цифры троичного индекса для символов board_matrix
+DIGITS = {' ': 0, 'X': 1, 'O': 2}
+
+# Запись: старшие 4 бита - оценка + 2 (1 - проигрыш, 2 - ничья, 3 - победа
+# того, кто ходит), младшие 4 бита - лучший ход (индекс клетки).
+# Нулевой байт - позиция недостижима из пустого поля
+NO_MOVE = 0x0F
+
+
+def board_index(board_matrix: List[str]) -> int:
+    """
+    Троичный индекс поля: клетка i - i-я троичная цифра
+    (0 - пусто, 1 - X, 2 - O)
+
+    Parameters
+    ----------
+    board_matrix: List[str]
+        Поле в виде списка "X", "O" и " ", как в tic()
+
+    Returns
+    -------
+    int
+        Число от 0 до 3**9 - 1
+    """
+    index = 0
+    for value in reversed(board_matrix):
+        index = index * 3 + DIGITS[value]
+    return index
+
+
+def solve(board: Bitboard, player: int, index: int, results: Dict[int, Tuple[int, int, int]]) -> Tuple[int, int]:
+    """
+    Решает позицию полным перебором и записывает в results
+    все позиции, достижимые из нее.
+
+    Parameters
+    ----------
+    board: Bitboard
+        Поле, на котором нет законченной линии
+    player: int
+        Чей ход: 0 - X, 1 - O
+    index: int
+        Троичный индекс поля
+    results: Dict[int, Tuple[int, int, int]]
+        {индекс: (оценка, лучший ход, ходов до конца партии)}
+
+    Returns
+    -------
+    Tuple[int, int]
+        (оценка для player: 1, 0 или -1; ходов до конца партии при лучшей игре)
+    """
+    if index in results:
+        value, _, length = results[index]
+        return value, length
+
+    best = None
+    for cell in board.empty_cells():
+        child_index = index + (player + 1) * 3 ** cell
+        if board.play(cell, player):
+            value, length = 1, 1
+            # Законченная партия: ходить больше некуда
+            results[child_index] = (-1, NO_MOVE, 0)
+        elif board.is_full():
+            value, length = 0, 1
+            results[child_index] = (0, NO_MOVE, 0)
+        else:
+            child_value, child_length = solve(board, 1 - player, child_index, results)
+            value, length = -child_value, child_length + 1
+        board.undo(cell, player)
+
+        # Лучше - выше оценка; при победе - быстрее, иначе - дольше
+        key = (value, -length if value > 0 else length)
+        if best is None or key > best[0]:
+            best = (key, value, cell, length)
+
+    _, value, cell, length = best
+    results[index] = (value, cell, length)
+    return value, length
+
+
+def build_table() -> bytes:
+    """
+    Таблица решенных позиций: по байту на каждый троичный индекс
+    """
+    results = {}
+    solve(Bitboard(SIZE), 0, 0, results)
+    table = bytearray(TABLE_SIZE)
+    for index, (value, cell, _) in results.items():
+        table[index] = (value + 2) << 4 | cell
+    return bytes(table)
+
+
+class SolvedTable:
+    """
+    Решенные позиции поля 3×3, отображенные в память (mmap).
+
+    Файл не читается целиком: ОС подгружает страницы по мере обращения,
+    поэтому открытие почти ничего не стоит, а ход компьютера -
+    вычисление индекса и чтение одного байта.
+    """
+
+    __slots__ = ('file', 'table')
+
+    def __init__(self, path: str = DB_FILE) -> None:
+        """
+        Parameters
+        ----------
+        path: str
+            Файл, записанный build_table()
+        """
+        self.file = open(path, 'rb')
+        try:
+            self.table = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise ValueError(f'Файл {path} пуст') from None
+        if len(self.table) != TABLE_SIZE:
+            self.close()
+            raise ValueError(f'В файле {path} не {TABLE_SIZE} байт')
+
+    @classmethod
+    def load(cls, path: str = DB_FILE) -> 'SolvedTable':
+        """
+        Таблица из файла или None, если файл еще не построен
+        """
+        if not os.path.exists(path):
+            return None
+        return cls(path)
+
+    def lookup(self, board_matrix: List[str]) -> Tuple[int, int]:
+        """
+        Решение позиции
+
+        Returns
+        -------
+        Tuple[int, int]
+            (оценка для того, кто ходит: 1, 0 или -1;
+            лучший ход - индекс клетки или None, если партия закончена)
+        """
+        record = self.table[board_index(board_matrix)]
+        if record == 0:
+            raise ValueError('Позиция недостижима в игре')
+        cell = record & 0x0F
+        return (record >> 4) - 2, None if cell == NO_MOVE else cell
+
+    def choose(self, board_matrix: List[str], user: str) -> int:
+        """
+        Ход компьютера для tic() - то же, что ComputerPlayer.choose()
+
+        Returns
+        -------
+        int
+            Номер клетки (от 1 до 9)
+        """
+        _, cell = self.lookup(board_matrix)
+        if cell is None:
+            raise ValueError('Партия уже закончена')
+        return cell + 1
+
+    def close(self) -> None:
+        """
+        Закрывает файл
+        """
+        self.table.close()
+        self.file.close()
+
+
+def main() -> None:
+    """
+    Строит файл решенных позиций поля 3×3
+    """
+    parser = argparse.ArgumentParser(description='Таблица решенных позиций Крестиков-Ноликов 3×3')
+    parser.add_argument('-f', '--filename',
+                        default=DB_FILE,
+                        help='Куда записать таблицу')
+    args = parser.parse_args()
+
+    table = build_table()
+    with open(args.filename, 'wb') as file:
+        file.write(table)
+    print(f'Позиций: {sum(1 for record in table if record)}, файл {args.filename}')
+
+
+if __name__ == '__main__':
+    main()
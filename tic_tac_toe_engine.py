@@ -0,0 +1,304 @@
+from functools import lru_cache
+from typing import List, Tuple
+
+# Игроки: индекс в Bitboard.boards и символ на поле
+PLAYERS = ('X', 'O')
+PLAYER_INDEX = {'X': 0, 'O': 1}
+
+# Направления линий (строка, столбец): вправо, вверх, вверх-вправо, вверх-влево
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+@lru_cache(maxsize=None)
+def line_masks(size: int, k: int = None) -> Tuple[int, ...]:
+    """
+    Маски всех выигрышных линий поля size×size.
+
+    Бит i маски - клетка i, то есть клетка с номером i+1 в tic().
+    Линия - k клеток подряд по строке, столбцу или одной из двух диагоналей.
+    При k = size это строки, столбцы и две главные диагонали.
+    Маски вычисляются один раз для каждой пары (size, k).
+
+    Parameters
+    ----------
+    size: int
+        Размер поля
+    k: int
+        Сколько клеток подряд нужно для победы (по умолчанию size)
+
+    Returns
+    -------
+    Tuple[int, ...]
+        Маски линий
+    """
+    k = size if k is None else k
+    if not 1 <= k <= size:
+        raise ValueError('Длина линии должна быть от 1 до размера поля')
+
+    masks = []
+    for d_row, d_col in DIRECTIONS:
+        for row in range(size):
+            for col in range(size):
+                end_row = row + d_row * (k - 1)
+                end_col = col + d_col * (k - 1)
+                if not (0 <= end_row < size and 0 <= end_col < size):
+                    continue
+                mask = 0
+                for step in range(k):
+                    mask |= 1 << ((row + d_row * step) * size + col + d_col * step)
+                masks.append(mask)
+    # При k = 1 все направления дают одни и те же маски
+    return tuple(dict.fromkeys(masks))
+
+
+@lru_cache(maxsize=None)
+def cell_masks(size: int, k: int = None) -> Tuple[Tuple[int, ...], ...]:
+    """
+    Для каждой клетки - маски линий, которые через нее проходят.
+    После хода измениться могли только эти линии
+
+    Returns
+    -------
+    Tuple[Tuple[int, ...], ...]
+        cell_masks(size, k)[i] - маски линий через клетку i
+    """
+    masks = line_masks(size, k)
+    return tuple(tuple(mask for mask in masks if mask >> cell & 1)
+                 for cell in range(size * size))
+
+
+class Bitboard:
+    """
+    Игровое поле в виде двух целых чисел: boards[0] - клетки X,
+    boards[1] - клетки O. Бит i - клетка i (клетка с номером i+1 в tic()).
+
+    Проверка победы после хода - несколько побитовых И с заранее
+    вычисленными масками линий, которые проходят через клетку хода.
+    Поле не печатает и не спрашивает ничего у пользователя, поэтому
+    его можно использовать для игр без консоли.
+    """
+
+    __slots__ = ('size', 'k', 'boards', 'full', 'masks', 'cell_masks')
+
+    def __init__(self, size: int = 3, k: int = None) -> None:
+        """
+        Parameters
+        ----------
+        size: int
+            Размер поля
+        k: int
+            Сколько клеток подряд нужно для победы (по умолчанию size)
+        """
+        self.size = size
+        self.k = size if k is None else k
+        self.boards = [0, 0]
+        self.full = (1 << size * size) - 1
+        self.masks = line_masks(size, self.k)
+        self.cell_masks = cell_masks(size, self.k)
+
+    def copy(self) -> 'Bitboard':
+        """
+        Копия поля (маски общие, они не меняются)
+        """
+        board = Bitboard.__new__(Bitboard)
+        board.size = self.size
+        board.k = self.k
+        board.boards = self.boards[:]
+        board.full = self.full
+        board.masks = self.masks
+        board.cell_masks = self.cell_masks
+        return board
+
+    @property
+    def occupied(self) -> int:
+        """
+        Маска занятых клеток
+        """
+        return self.boards[0] | self.boards[1]
+
+    def is_empty(self, cell: int) -> bool:
+        """
+        Свободна ли клетка cell
+        """
+        return not self.occupied >> cell & 1
+
+    def empty_cells(self) -> List[int]:
+        """
+        Индексы свободных клеток
+        """
+        free = self.full & ~self.occupied
+        cells = []
+        while free:
+            low = free & -free
+            cells.append(low.bit_length() - 1)
+            free ^= low
+        return cells
+
+    def is_full(self) -> bool:
+        """
+        Заняты ли все клетки
+        """
+        return self.occupied == self.full
+
+    def play(self, cell: int, player: int) -> bool:
+        """
+        Ставит символ игрока player в клетку cell
+
+        Parameters
+        ----------
+        cell: int
+            Индекс клетки (номер клетки минус 1)
+        player: int
+            0 - X, 1 - O
+
+        Returns
+        -------
+        bool
+            Выиграл ли player этим ходом
+        """
+        if not self.is_empty(cell):
+            raise ValueError(f'Клетка {cell + 1} уже занята')
+        bits = self.boards[player] | 1 << cell
+        self.boards[player] = bits
+        for mask in self.cell_masks[cell]:
+            if bits & mask == mask:
+                return True
+        return False
+
+    def undo(self, cell: int, player: int) -> None:
+        """
+        Убирает символ игрока player из клетки cell
+        """
+        self.boards[player] &= ~(1 << cell)
+
+    def is_win(self, player: int) -> bool:
+        """
+        Есть ли у игрока player заполненная линия (проверяются все линии)
+        """
+        bits = self.boards[player]
+        for mask in self.masks:
+            if bits & mask == mask:
+                return True
+        return False
+
+    @classmethod
+    def from_matrix(cls, board_matrix: List[str], k: int = None) -> 'Bitboard':
+        """
+        Поле из списка board_matrix функции tic()
+        """
+        size = round(len(board_matrix) ** 0.5)
+        board = cls(size, k)
+        for cell, value in enumerate(board_matrix):
+            if value in PLAYER_INDEX:
+                board.boards[PLAYER_INDEX[value]] |= 1 << cell
+        return board
+
+    def to_matrix(self) -> List[str]:
+        """
+        Поле в виде списка board_matrix функции tic()
+        """
+        x, o = self.boards
+        return ['X' if x >> cell & 1 else 'O' if o >> cell & 1 else ' '
+                for cell in range(self.size * self.size)]
+
+
+class GameState:
+    """
+    Состояние партии: то же, что board_matrix, last_input и step в tic(),
+    ходы по порядку (moves) и счетчики линий, с которыми победа проверяется за O(1) на ход
+    при любом размере поля.
+
+    Для каждого из четырех направлений runs хранит длину непрерывной
+    линии одинаковых символов в ее концевых клетках. Новый символ может
+    только продолжить линии, которые заканчиваются в соседних клетках:
+    их длины уже записаны в соседях, поэтому длина новой линии -
+    сумма двух чисел плюс один, а обновить нужно только два ее конца.
+    Значения во внутренних клетках линий устаревают, но больше не читаются:
+    читаются только соседи свободной клетки, а они всегда концевые.
+    """
+
+    __slots__ = ('size', 'k', 'board_matrix', 'last_input', 'moves', 'step', 'user', 'winner', 'runs')
+
+    def __init__(self, size: int = 3, k: int = None) -> None:
+        """
+        Parameters
+        ----------
+        size: int
+            Размер поля
+        k: int
+            Сколько символов подряд нужно для победы (по умолчанию size),
+            например 5 для гомоку на поле 15×15
+        """
+        self.k = size if k is None else k
+        if not 1 <= self.k <= size:
+            raise ValueError('Длина линии должна быть от 1 до размера поля')
+        self.size = size
+        self.board_matrix = [' ' for _ in range(size * size)]
+        self.last_input = set()
+        # Номера клеток в порядке ходов (last_input порядок не хранит)
+        self.moves = []
+        self.step = 0
+        # Первый ходит Х
+        self.user = 'X'
+        self.winner = None
+        self.runs = [[0] * (size * size) for _ in DIRECTIONS]
+
+    def play(self, number: int) -> bool:
+        """
+        Ход текущего игрока в клетку с номером number (от 1 до size*size),
+        после хода очередь переходит к другому игроку
+
+        Returns
+        -------
+        bool
+            Выиграл ли игрок этим ходом
+        """
+        size = self.size
+        board_matrix = self.board_matrix
+        cell = number - 1
+        if not 0 <= cell < size * size or board_matrix[cell] != ' ':
+            raise ValueError(f'В клетку {number} ходить нельзя')
+        if self.winner is not None:
+            raise ValueError('Партия уже закончилась')
+
+        user = self.user
+        board_matrix[cell] = user
+        self.last_input.add(number)
+        self.moves.append(number)
+        self.step += 1
+        self.user = 'O' if user == 'X' else 'X'
+
+        row, col = divmod(cell, size)
+        win = False
+        for runs, (d_row, d_col) in zip(self.runs, DIRECTIONS):
+            shift = d_row * size + d_col
+
+            # Длина линии, которая заканчивается в соседней клетке "до"
+            before = 0
+            row_before, col_before = row - d_row, col - d_col
+            if (0 <= row_before < size and 0 <= col_before < size
+                    and board_matrix[cell - shift] == user):
+                before = runs[cell - shift]
+
+            # и "после" клетки хода
+            after = 0
+            row_after, col_after = row + d_row, col + d_col
+            if (0 <= row_after < size and 0 <= col_after < size
+                    and board_matrix[cell + shift] == user):
+                after = runs[cell + shift]
+
+            length = before + 1 + after
+            runs[cell - before * shift] = length
+            runs[cell + after * shift] = length
+            if length >= self.k:
+                win = True
+
+        if win:
+            self.winner = user
+        return win
+
+    def is_over(self) -> bool:
+        """
+        Закончилась ли партия победой или ничьей
+        """
+        return self.winner is not None or self.step == self.size * self.size
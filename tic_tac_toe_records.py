@@ -0,0 +1,484 @@
+import os
+import time
+import random
+import argparse
+from typing import Dict, Iterator, List, Sequence, Tuple, Union
+from tic_tac_toe_engine import Bitboard, GameState
+from tic_tac_toe_ai import symmetries
+from tic_tac_toe_sim import STRATEGIES
+
+# Файл, в который tic() дописывает сыгранные партии
+RECORDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tic_tac_toe_games.bin')
+
+# Заголовок файла записей
+MAGIC = b'TTR1'
+
+# Итог партии в записи
+X_WIN, O_WIN, DRAW, UNFINISHED = 0, 1, 2, 3
+RESULT_NAMES = ('X', 'O', 'ничья', 'не закончена')
+
+# До какого размера поля ход записывается одним байтом (16×16 = 256 клеток)
+BYTE_MOVES_SIZE = 16
+
+# Сколько байт читается из файла за раз
+CHUNK_SIZE = 1 << 20
+
+# Сколько ходов от начала партии учитывается в статистике дебютов
+OPENING_DEPTH = 3
+
+# Запись партии:
+#     size    varint  размер поля
+#     k       varint  сколько символов подряд нужно для победы
+#     result  байт    X_WIN, O_WIN, DRAW или UNFINISHED
+#     count   varint  количество ходов
+#     moves           индексы клеток (номер клетки минус 1) по порядку:
+#                     по байту на ход, если size <= 16, иначе varint
+# Varint - 7 бит числа в байте, старший бит - есть ли следующий байт.
+# Запись партии 3×3 занимает 4 байта плюс по байту на ход.
+
+
+class RecordError(ValueError):
+    """
+    Файл записей испорчен: нет заголовка или последняя запись оборвана
+    """
+
+
+def encode_varint(value: int) -> bytes:
+    """
+    Неотрицательное число в формате varint
+    """
+    result = bytearray()
+    while value >= 0x80:
+        result.append(value & 0x7F | 0x80)
+        value >>= 7
+    result.append(value)
+    return bytes(result)
+
+
+def decode_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    """
+    Число varint из data начиная с позиции pos.
+    Если данные закончились раньше числа, выбрасывает IndexError
+
+    Returns
+    -------
+    Tuple[int, int]
+        (число, позиция после него)
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def encode_game(size: int, k: int, cells: Sequence[int], result: int) -> bytes:
+    """
+    Запись одной партии
+
+    Parameters
+    ----------
+    size: int
+        Размер поля
+    k: int
+        Сколько символов подряд нужно для победы
+    cells: Sequence[int]
+        Индексы клеток по порядку ходов
+    result: int
+        X_WIN, O_WIN, DRAW или UNFINISHED
+
+    Returns
+    -------
+    bytes
+        Запись партии
+    """
+    header = encode_varint(size) + encode_varint(k) + bytes((result,)) + encode_varint(len(cells))
+    if size <= BYTE_MOVES_SIZE:
+        return header + bytes(cells)
+    return header + b''.join(encode_varint(cell) for cell in cells)
+
+
+def game_result(game: GameState) -> int:
+    """
+    Итог партии GameState для записи
+    """
+    if game.winner is not None:
+        return X_WIN if game.winner == 'X' else O_WIN
+    return DRAW if game.is_over() else UNFINISHED
+
+
+class RecordWriter:
+    """
+    Дописывает партии в файл записей. Заголовок пишется,
+    только если файл пустой
+    """
+
+    def __init__(self, path: str = RECORDS_FILE) -> None:
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+
+    def write(self, size: int, k: int, cells: Sequence[int], result: int) -> None:
+        """
+        Дописывает партию (параметры - как у encode_game())
+        """
+        self.file.write(encode_game(size, k, cells, result))
+
+    def write_game(self, game: GameState) -> None:
+        """
+        Дописывает партию из GameState
+        """
+        self.write(game.size, game.k, [number - 1 for number in game.moves], game_result(game))
+
+    def close(self) -> None:
+        """
+        Закрывает файл
+        """
+        self.file.close()
+
+    def __enter__(self) -> 'RecordWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def append_game(game: GameState, path: str = RECORDS_FILE) -> None:
+    """
+    Дописывает одну партию в файл записей (так делает tic())
+    """
+    with RecordWriter(path) as writer:
+        writer.write_game(game)
+
+
+def iter_records(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[int, int, int, Union[bytes, tuple]]]:
+    """
+    Читает файл записей по частям и возвращает партии по одной,
+    поэтому файл может быть больше памяти
+
+    Parameters
+    ----------
+    path: str
+        Файл записей
+    chunk_size: int
+        Сколько байт читать за раз
+
+    Returns
+    -------
+    Iterator[Tuple[int, int, int, Union[bytes, tuple]]]
+        (size, k, result, ходы). Ходы - bytes при size <= 16
+        (индекс клетки - значение байта), иначе кортеж чисел.
+        Если файл не начинается с MAGIC или последняя запись оборвана,
+        после всех целых записей выбрасывается RecordError
+    """
+    with open(path, 'rb') as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise RecordError(f'{path} - не файл записей партий')
+
+        data = b''
+        while chunk := file.read(chunk_size):
+            data = data + chunk if data else chunk
+            end = len(data)
+            pos = 0
+            try:
+                while pos < end:
+                    start = pos
+                    # Числа меньше 128 - один байт, разбираются без decode_varint
+                    size = data[pos]
+                    pos += 1
+                    if size >= 0x80:
+                        size, pos = decode_varint(data, start)
+                    k = data[pos]
+                    pos += 1
+                    if k >= 0x80:
+                        k, pos = decode_varint(data, pos - 1)
+                    result = data[pos]
+                    count = data[pos + 1]
+                    pos += 2
+                    if count >= 0x80:
+                        count, pos = decode_varint(data, pos - 1)
+
+                    if size <= BYTE_MOVES_SIZE:
+                        if pos + count > end:
+                            raise IndexError
+                        moves = data[pos:pos + count]
+                        pos += count
+                    else:
+                        moves = []
+                        for _ in range(count):
+                            cell, pos = decode_varint(data, pos)
+                            moves.append(cell)
+                        moves = tuple(moves)
+                    yield size, k, result, moves
+            except IndexError:
+                # Запись разрезана границей куска: дочитываем
+                pos = start
+            data = data[pos:]
+
+        if data:
+            raise RecordError(f'последняя запись обрывается, {len(data)} байт в конце файла пропущено')
+
+
+def validate_game(board: Union[Bitboard, GameState], result: int, moves: Sequence[int]) -> str:
+    """
+    Проигрывает партию заново и проверяет ходы и итог
+
+    Parameters
+    ----------
+    board: Union[Bitboard, GameState]
+        Пустое поле нужного размера (изменяется). Bitboard быстрее, но его
+        маски линий растут с размером поля как size**4, поэтому большие
+        поля проверяются счетчиками линий GameState
+    result: int
+        Итог из записи
+    moves: Sequence[int]
+        Индексы клеток по порядку ходов
+
+    Returns
+    -------
+    str
+        Описание ошибки или None, если партия верна
+    """
+    cells = board.size * board.size
+    if len(moves) > cells:
+        return f'ходов больше, чем клеток: {len(moves)}'
+    if isinstance(board, GameState):
+        def play(cell: int, player: int) -> bool:
+            return board.play(cell + 1)
+    else:
+        play = board.play
+
+    last = len(moves) - 1
+    winner = None
+    player = 0
+    for step, cell in enumerate(moves):
+        if cell >= cells:
+            return f'ход {step + 1}: клетки {cell + 1} нет на поле'
+        try:
+            if play(cell, player):
+                if step != last:
+                    return f'ход {step + 1}: после победы есть еще ходы'
+                winner = player
+        except ValueError as error:
+            return f'ход {step + 1}: {error}'
+        player = 1 - player
+
+    if winner is not None:
+        expected = winner
+    else:
+        expected = DRAW if len(moves) == cells else UNFINISHED
+    if expected != result:
+        return f'в записи итог "{RESULT_NAMES[result] if result < 4 else result}", ' \
+               f'а на поле "{RESULT_NAMES[expected]}"'
+    return None
+
+
+class PositionIndex:
+    """
+    Индекс позиций дебютов.
+
+    Позиция - поле после первых ходов партии, приведенное к каноническому
+    виду (наименьшее из восьми симметричных полей), поэтому симметричные
+    дебюты и разные порядки одних и тех же ходов считаются одной позицией.
+    Приведение к каноническому виду - самая дорогая часть подсчета,
+    а различных начал партий немного, поэтому ключ позиции кэшируется
+    по байтам начала партии.
+    """
+
+    def __init__(self) -> None:
+        # (size, k, начало партии) -> номер позиции
+        self.cache: Dict[tuple, int] = {}
+        # (size, k, каноническое поле) -> номер позиции
+        self.positions: Dict[tuple, int] = {}
+        # Для каждой позиции: (size, k, ходы первой встреченной партии)
+        self.openings: List[tuple] = []
+        self.symmetries: Dict[int, List[Tuple[int, ...]]] = {}
+
+    def position(self, size: int, k: int, prefix: Union[bytes, tuple]) -> int:
+        """
+        Номер позиции после ходов prefix
+        """
+        cache_key = (size, k, prefix)
+        number = self.cache.get(cache_key)
+        if number is not None:
+            return number
+
+        permutations = self.symmetries.get(size)
+        if permutations is None:
+            permutations = self.symmetries[size] = symmetries(size)
+        canonical = min(self.board(permutation, prefix) for permutation in permutations)
+
+        position_key = (size, k, canonical)
+        number = self.positions.get(position_key)
+        if number is None:
+            number = self.positions[position_key] = len(self.openings)
+            self.openings.append((size, k, tuple(prefix)))
+        self.cache[cache_key] = number
+        return number
+
+    @staticmethod
+    def board(permutation: Tuple[int, ...], prefix: Union[bytes, tuple]) -> Tuple[int, int]:
+        """
+        Клетки X и O после ходов prefix на поле, к которому применена симметрия
+        """
+        boards = [0, 0]
+        for step, cell in enumerate(prefix):
+            boards[step & 1] |= 1 << permutation[cell]
+        return tuple(boards)
+
+
+def analyze(paths: List[str], depth: int = OPENING_DEPTH, chunk_size: int = CHUNK_SIZE) -> dict:
+    """
+    Проверяет все партии из файлов записей и считает статистику дебютов
+
+    Parameters
+    ----------
+    paths: List[str]
+        Файлы записей
+    depth: int
+        Сколько первых ходов партии учитывается в статистике дебютов
+
+    Returns
+    -------
+    dict
+        games - количество партий, results - сколько партий с каждым итогом,
+        invalid - список (файл, номер партии, ошибка), в том числе
+        оборванная последняя запись файла,
+        openings - {ход: [(size, k, ходы, [партии, X, O, ничьи, не закончены]), ...]},
+        index - PositionIndex
+    """
+    index = PositionIndex()
+    # Пустые Bitboard для проверки партий: копировать быстрее, чем создавать
+    empty_boards = {}
+    stats: Dict[int, List[int]] = {}
+    results = [0, 0, 0, 0]
+    invalid = []
+    games = 0
+
+    for path in paths:
+        number = 0
+        try:
+            for number, (size, k, result, moves) in enumerate(iter_records(path, chunk_size), 1):
+                games += 1
+                try:
+                    if size > BYTE_MOVES_SIZE:
+                        board = GameState(size, k)
+                    else:
+                        board = empty_boards.get((size, k))
+                        if board is None:
+                            board = empty_boards[(size, k)] = Bitboard(size, k)
+                        board = board.copy()
+                except ValueError as error:
+                    invalid.append((path, number, str(error)))
+                    continue
+                error = validate_game(board, result, moves)
+                if error is not None:
+                    invalid.append((path, number, error))
+                    continue
+
+                results[result] += 1
+                for ply in range(1, min(depth, len(moves)) + 1):
+                    position = index.position(size, k, moves[:ply])
+                    counts = stats.get(position)
+                    if counts is None:
+                        counts = stats[position] = [ply, 0, 0, 0, 0, 0]
+                    counts[1] += 1
+                    counts[2 + result] += 1
+        except RecordError as error:
+            # Оборванная последняя запись (например, прерванная запись tic())
+            # не мешает проверить остальные партии файла
+            invalid.append((path, number + 1, str(error)))
+
+    openings = {}
+    for position, (ply, *counts) in stats.items():
+        size, k, prefix = index.openings[position]
+        openings.setdefault(ply, []).append((size, k, prefix, counts))
+    for positions in openings.values():
+        positions.sort(key=lambda opening: opening[3][0], reverse=True)
+    return {'games': games, 'results': results, 'invalid': invalid,
+            'openings': openings, 'index': index}
+
+
+def generate(path: str, games: int, x_name: str = 'random', o_name: str = 'random',
+             size: int = 3, k: int = None, seed: int = 0) -> None:
+    """
+    Дописывает в файл записей games партий между стратегиями
+    tic_tac_toe_sim.py - данные для проверки analyze()
+    """
+    k = size if k is None else k
+    rng = random.Random(seed)
+    players = (STRATEGIES[x_name](size, k, rng), STRATEGIES[o_name](size, k, rng))
+    empty_board = Bitboard(size, k)
+    with RecordWriter(path) as writer:
+        for _ in range(games):
+            board = empty_board.copy()
+            cells = []
+            result = DRAW
+            for step in range(size * size):
+                player = step & 1
+                cell = players[player](board, player)
+                cells.append(cell)
+                if board.play(cell, player):
+                    result = player
+                    break
+            writer.write(size, k, cells, result)
+
+
+def main() -> None:
+    """
+    generate - записать партии стратегий, replay - проверить записи и вывести статистику дебютов
+    """
+    parser = argparse.ArgumentParser(description='Записи партий Крестиков-Ноликов')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate_parser = subparsers.add_parser('generate', help='Записать партии между стратегиями')
+    generate_parser.add_argument('-f', '--filename', default=RECORDS_FILE, help='Файл записей')
+    generate_parser.add_argument('-n', '--games', type=int, default=1000000, help='Количество партий')
+    generate_parser.add_argument('-x', '--x_strategy', choices=list(STRATEGIES), default='random',
+                                 help='Стратегия X')
+    generate_parser.add_argument('-o', '--o_strategy', choices=list(STRATEGIES), default='random',
+                                 help='Стратегия O')
+    generate_parser.add_argument('-s', '--size', type=int, default=3, help='Размер поля')
+    generate_parser.add_argument('-k', '--win_length', type=int, default=None,
+                                 help='Сколько символов подряд нужно для победы (по умолчанию size)')
+    generate_parser.add_argument('--seed', type=int, default=0, help='Зерно случайных ходов')
+
+    replay_parser = subparsers.add_parser('replay', help='Проверить записи и вывести статистику дебютов')
+    replay_parser.add_argument('filenames', nargs='*', default=[RECORDS_FILE], help='Файлы записей')
+    replay_parser.add_argument('-d', '--depth', type=int, default=OPENING_DEPTH,
+                               help='Сколько первых ходов учитывать в статистике дебютов')
+    replay_parser.add_argument('-t', '--top', type=int, default=5,
+                               help='Сколько самых частых позиций выводить для каждого хода')
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        generate(args.filename, args.games, args.x_strategy, args.o_strategy,
+                 args.size, args.win_length, args.seed)
+        return
+
+    start = time.perf_counter()
+    stats = analyze(args.filenames, args.depth)
+    elapsed = time.perf_counter() - start
+
+    games = stats['games']
+    print(f'Партий: {games}, неверных: {len(stats["invalid"])}, '
+          f'{games / elapsed * 60:,.0f} партий в минуту')
+    for path, number, error in stats['invalid'][:10]:
+        print(f'  {path}, партия {number}: {error}')
+    for name, count in zip(RESULT_NAMES, stats['results']):
+        print(f'{name}: {count}')
+
+    for ply, positions in sorted(stats['openings'].items()):
+        print(f'\nПозиции после {ply}-го хода: {len(positions)}')
+        for size, k, prefix, (count, x_wins, o_wins, draws, _) in positions[:args.top]:
+            moves = ' '.join(str(cell + 1) for cell in prefix)
+            print(f'  {size}×{size} k={k} [{moves}]: {count} партий, X {x_wins / count:.1%}, '
+                  f'O {o_wins / count:.1%}, ничьи {draws / count:.1%}')
+
+
+if __name__ == '__main__':
+    main()
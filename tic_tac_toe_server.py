@@ -0,0 +1,302 @@
+import time
+import random
+import asyncio
+import argparse
+from typing import Dict, List, Set
+from tic_tac_toe_engine import GameState
+
+HOST = '127.0.0.1'
+PORT = 8765
+
+# Самое большое поле, которое можно создать командой NEW
+MAX_SIZE = 100
+
+# Сколько партий одновременно может вести одно соединение. Партия на поле
+# MAX_SIZE занимает около 400 КБ, и без предела один клиент мог бы занять
+# всю память сервера командами NEW
+MAX_GAMES = 10
+
+PROTOCOL = """
+Протокол - строки UTF-8, одна команда в строке:
+    NEW [size [k]]      -> GAME <id> X <size> <k>   новая партия, создатель играет за X
+    JOIN <id>           -> GAME <id> O <size> <k>   присоединиться к партии за O
+    MOVE <id> <number>  -> MOVED <id> <user> <number> NEXT|WIN|DRAW
+    QUIT                    закрыть соединение
+Ошибки: ERROR <текст>. Ход сопернику приходит той же строкой MOVED,
+а если соперник отключился - CLOSED <id>. Одно соединение может
+занять оба места в партии (NEW, затем JOIN) и играть за обоих, как в tic(),
+и вести не больше {max_games} партий одновременно.
+"""
+
+
+class Game:
+    """
+    Партия на сервере: состояние GameState и соединения игроков
+    (players[0] - X, players[1] - O, None - место свободно)
+    """
+
+    __slots__ = ('state', 'players')
+
+    def __init__(self, size: int, k: int) -> None:
+        self.state = GameState(size, k)
+        self.players = [None, None]
+
+
+class GameServer:
+    """
+    Сервер партий на asyncio: все партии и соединения обслуживаются
+    в одном процессе и одном потоке, партия занимает один объект Game
+    """
+
+    def __init__(self) -> None:
+        self.games: Dict[int, Game] = {}
+        # Номера партий каждого соединения, чтобы при отключении
+        # не просматривать все партии сервера
+        self.connections: Dict[asyncio.StreamWriter, Set[int]] = {}
+        self.next_id = 1
+
+    def new_game(self, writer: asyncio.StreamWriter, args: List[str]) -> str:
+        """
+        NEW [size [k]]
+        """
+        size = int(args[0]) if args else 3
+        k = int(args[1]) if len(args) > 1 else size
+        if not 1 <= size <= MAX_SIZE:
+            raise ValueError(f'Размер поля должен быть от 1 до {MAX_SIZE}')
+        if len(self.connections[writer]) >= MAX_GAMES:
+            raise ValueError(f'Нельзя вести больше {MAX_GAMES} партий одновременно')
+        game = Game(size, k)
+        game.players[0] = writer
+        game_id = self.next_id
+        self.next_id += 1
+        self.games[game_id] = game
+        self.connections[writer].add(game_id)
+        return f'GAME {game_id} X {size} {game.state.k}'
+
+    def join_game(self, writer: asyncio.StreamWriter, args: List[str]) -> str:
+        """
+        JOIN <id>
+        """
+        game_id = int(args[0])
+        game = self.get_game(game_id)
+        if game.players[1] is not None:
+            raise ValueError('Место O уже занято')
+        game.players[1] = writer
+        self.connections[writer].add(game_id)
+        return f'GAME {game_id} O {game.state.size} {game.state.k}'
+
+    def move(self, writer: asyncio.StreamWriter, args: List[str]) -> str:
+        """
+        MOVE <id> <number>. Ход также отправляется сопернику
+        """
+        game_id, number = int(args[0]), int(args[1])
+        game = self.get_game(game_id)
+        state = game.state
+        user = state.user
+        if game.players[0 if user == 'X' else 1] is not writer:
+            raise ValueError('Сейчас не ваш ход')
+
+        win = state.play(number)
+        if win:
+            status = 'WIN'
+        elif state.is_over():
+            status = 'DRAW'
+        else:
+            status = 'NEXT'
+        line = f'MOVED {game_id} {user} {number} {status}'
+
+        opponent = game.players[1 if user == 'X' else 0]
+        if opponent is not None and opponent is not writer:
+            opponent.write(line.encode() + b'\n')
+        if status != 'NEXT':
+            self.remove_game(game_id)
+        return line
+
+    def get_game(self, game_id: int) -> Game:
+        """
+        Партия по номеру
+        """
+        game = self.games.get(game_id)
+        if game is None:
+            raise ValueError(f'Партии {game_id} нет')
+        return game
+
+    def remove_game(self, game_id: int) -> Game:
+        """
+        Удаляет партию у сервера и у соединений ее игроков
+        """
+        game = self.games.pop(game_id)
+        for player in game.players:
+            if player is not None:
+                self.connections[player].discard(game_id)
+        return game
+
+    def close_games(self, writer: asyncio.StreamWriter) -> None:
+        """
+        Удаляет партии отключившегося игрока и сообщает об этом соперникам
+        """
+        for game_id in list(self.connections[writer]):
+            game = self.remove_game(game_id)
+            for player in game.players:
+                if player is not None and player is not writer:
+                    player.write(f'CLOSED {game_id}\n'.encode())
+        del self.connections[writer]
+
+    async def handle_client(self, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter) -> None:
+        """
+        Обрабатывает команды одного соединения, пока оно не закроется
+        """
+        commands = {'NEW': self.new_game, 'JOIN': self.join_game, 'MOVE': self.move}
+        self.connections[writer] = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    # Строка длиннее буфера StreamReader: readline() ее
+                    # отбрасывает, соединение можно читать дальше
+                    writer.write('ERROR Слишком длинная строка\n'.encode())
+                    await writer.drain()
+                    continue
+                if not line:
+                    break
+                try:
+                    command, *args = line.decode().split() or ['']
+                except UnicodeDecodeError:
+                    writer.write('ERROR Строка не в UTF-8\n'.encode())
+                    await writer.drain()
+                    continue
+                if command == 'QUIT':
+                    break
+                try:
+                    reply = commands[command](writer, args)
+                except KeyError:
+                    reply = f'ERROR Неизвестная команда {command}'
+                except IndexError:
+                    reply = f'ERROR Не хватает аргументов команды {command}'
+                except ValueError as error:
+                    reply = f'ERROR {error}'
+                writer.write(reply.encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.close_games(writer)
+            writer.close()
+
+
+async def serve(host: str, port: int) -> None:
+    """
+    Запускает сервер и обслуживает соединения, пока процесс не остановят
+    """
+    game_server = GameServer()
+    server = await asyncio.start_server(game_server.handle_client, host, port)
+    print(f'Сервер Крестиков-Ноликов на {host}:{port}')
+    print(PROTOCOL.format(max_games=MAX_GAMES))
+    async with server:
+        await server.serve_forever()
+
+
+async def play_client(host: str, port: int, games: int, size: int, k: int,
+                      latencies: List[float], rng: random.Random) -> None:
+    """
+    Клиент нагрузочного теста: играет games партий за обе стороны
+    случайными ходами и записывает время ответа на каждый ход
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+
+    async def request(line: str) -> List[str]:
+        writer.write(line.encode() + b'\n')
+        reply = (await reader.readline()).decode().split()
+        if not reply or reply[0] == 'ERROR':
+            raise RuntimeError(f'{line}: {" ".join(reply)}')
+        return reply
+
+    for _ in range(games):
+        game_id = (await request(f'NEW {size} {k}'))[1]
+        await request(f'JOIN {game_id}')
+        cells = list(range(1, size * size + 1))
+        rng.shuffle(cells)
+        for number in cells:
+            start = time.perf_counter()
+            reply = await request(f'MOVE {game_id} {number}')
+            latencies.append(time.perf_counter() - start)
+            if reply[4] != 'NEXT':
+                break
+
+    writer.write(b'QUIT\n')
+    writer.close()
+    await writer.wait_closed()
+
+
+async def load_test(host: str, port: int, connections: int, games: int,
+                    size: int, k: int, seed: int) -> None:
+    """
+    Открывает connections соединений, каждое играет games партий подряд.
+    Выводит количество ходов в секунду и задержку ответа на ход
+    """
+    latencies = []
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    await asyncio.gather(*(play_client(host, port, games, size, k, latencies,
+                                       random.Random(rng.getrandbits(64)))
+                           for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    moves = len(latencies)
+    print(f'Соединений: {connections}, партий: {connections * games}, ходов: {moves}')
+    print(f'Ходов в секунду: {moves / elapsed:,.0f}')
+    print(f'Задержка хода p50: {latencies[moves // 2] * 1000:.2f} мс, '
+          f'p99: {latencies[min(moves - 1, moves * 99 // 100)] * 1000:.2f} мс')
+
+
+def main() -> None:
+    """
+    serve - запустить сервер, load - нагрузочный тест запущенного сервера
+    """
+    parser = argparse.ArgumentParser(description='Сервер Крестиков-Ноликов')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = subparsers.add_parser('serve', help='Запустить сервер')
+    load_parser = subparsers.add_parser('load', help='Нагрузочный тест')
+    for subparser in (serve_parser, load_parser):
+        subparser.add_argument('--host', default=HOST, help='Адрес сервера')
+        subparser.add_argument('--port', type=int, default=PORT, help='Порт сервера')
+
+    load_parser.add_argument('-c', '--connections',
+                             type=int,
+                             default=1000,
+                             help='Количество одновременных соединений (партий)')
+    load_parser.add_argument('-g', '--games',
+                             type=int,
+                             default=10,
+                             help='Сколько партий подряд играет каждое соединение')
+    load_parser.add_argument('-s', '--size',
+                             type=int,
+                             default=3,
+                             help='Размер поля')
+    load_parser.add_argument('-k', '--win_length',
+                             type=int,
+                             default=None,
+                             help='Сколько символов подряд нужно для победы (по умолчанию size)')
+    load_parser.add_argument('--seed',
+                             type=int,
+                             default=0,
+                             help='Зерно случайных ходов')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        try:
+            asyncio.run(serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+    else:
+        k = args.size if args.win_length is None else args.win_length
+        asyncio.run(load_test(args.host, args.port, args.connections, args.games,
+                              args.size, k, args.seed))
+
+
+if __name__ == '__main__':
+    main()
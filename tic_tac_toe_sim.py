@@ -0,0 +1,224 @@
+import time
+import random
+import argparse
+from multiprocessing import Pool
+from typing import Callable, Tuple
+from tic_tac_toe_engine import Bitboard
+from tic_tac_toe_ai import ComputerPlayer
+from tic_tac_toe_db import SolvedTable
+
+# Сколько партий играет процесс за одно задание
+CHUNK_SIZE = 1000
+
+# Сколько позиций стратегия search просматривает за ход. Ограничение
+# по позициям, а не по времени, чтобы ходы не зависели от загрузки
+# процессора и количества процессов (на 4×4 это около 0.05 с)
+SEARCH_NODES = 5000
+
+
+def random_strategy(size: int, k: int, rng: random.Random) -> Callable:
+    """
+    Ход в случайную свободную клетку.
+    Клетки выбираются наугад, пока не попадется свободная: это
+    быстрее, чем каждый ход составлять список свободных клеток
+    """
+    cells = size * size
+    random_number = rng.random
+
+    def choose(board: Bitboard, player: int) -> int:
+        occupied = board.occupied
+        while True:
+            cell = int(random_number() * cells)
+            if not occupied >> cell & 1:
+                return cell
+    return choose
+
+
+def greedy_strategy(size: int, k: int, rng: random.Random) -> Callable:
+    """
+    Выигрывает, если можно выиграть одним ходом, иначе мешает
+    выиграть сопернику, иначе ходит в случайную свободную клетку
+    """
+    def choose(board: Bitboard, player: int) -> int:
+        cells = board.empty_cells()
+        for who in (player, 1 - player):
+            bits = board.boards[who]
+            for cell in cells:
+                line = bits | 1 << cell
+                for mask in board.cell_masks[cell]:
+                    if line & mask == mask:
+                        return cell
+        return rng.choice(cells)
+    return choose
+
+
+def search_strategy(size: int, k: int, rng: random.Random) -> Callable:
+    """
+    Ход ComputerPlayer (negamax) с ограничением SEARCH_NODES позиций
+    """
+    computer_player = ComputerPlayer(size, k, time_limit=None, seed=rng.getrandbits(32),
+                                     max_nodes=SEARCH_NODES)
+    return computer_player.best_move
+
+
+def table_strategy(size: int, k: int, rng: random.Random) -> Callable:
+    """
+    Лучший ход из таблицы решенных позиций 3×3 (tic_tac_toe_db.py)
+    """
+    table = SolvedTable.load() if (size, k) == (3, 3) else None
+    if table is None:
+        raise ValueError('Стратегия table работает только на поле 3×3 '
+                         'с построенной таблицей (python tic_tac_toe_db.py)')
+
+    def choose(board: Bitboard, player: int) -> int:
+        return table.lookup(board.to_matrix())[1]
+    return choose
+
+
+# Стратегии: функция (size, k, rng), которая возвращает
+# функцию выбора хода (board, player) -> индекс клетки
+STRATEGIES = {
+    'random': random_strategy,
+    'greedy': greedy_strategy,
+    'search': search_strategy,
+    'table': table_strategy,
+}
+
+
+def play_game(size: int, k: int, x_choose: Callable, o_choose: Callable) -> Tuple[int, int]:
+    """
+    Одна партия без консоли
+
+    Parameters
+    ----------
+    size: int
+        Размер поля
+    k: int
+        Сколько символов подряд нужно для победы
+    x_choose, o_choose: Callable
+        Функции выбора хода игроков X и O
+
+    Returns
+    -------
+    Tuple[int, int]
+        (победитель: 0 - X, 1 - O, -1 - ничья; количество ходов)
+    """
+    board = Bitboard(size, k)
+    players = (x_choose, o_choose)
+    player = 0
+    for length in range(1, size * size + 1):
+        if board.play(players[player](board, player), player):
+            return player, length
+        player = 1 - player
+    return -1, size * size
+
+
+def play_chunk(task: tuple) -> Tuple[int, int, int, int]:
+    """
+    Серия партий в отдельном процессе
+
+    Parameters
+    ----------
+    task: tuple
+        (стратегия X, стратегия O, size, k, количество партий, зерно)
+
+    Returns
+    -------
+    Tuple[int, int, int, int]
+        (победы X, победы O, ничьи, сумма ходов всех партий)
+    """
+    x_name, o_name, size, k, games, seed = task
+    rng = random.Random(seed)
+    x_choose = STRATEGIES[x_name](size, k, rng)
+    o_choose = STRATEGIES[o_name](size, k, rng)
+
+    results = [0, 0, 0]
+    moves = 0
+    for _ in range(games):
+        winner, length = play_game(size, k, x_choose, o_choose)
+        results[winner] += 1
+        moves += length
+    x_wins, o_wins, draws = results
+    return x_wins, o_wins, draws, moves
+
+
+def simulate(games: int, x_name: str, o_name: str, size: int = 3, k: int = None,
+             workers: int = 1, seed: int = 0, chunk_size: int = CHUNK_SIZE) -> dict:
+    """
+    Играет games партий между стратегиями x_name и o_name
+    в workers процессах
+
+    Returns
+    -------
+    dict
+        Доли побед X и O и ничьих, средняя длина партии, партий в секунду
+    """
+    k = size if k is None else k
+    # У каждого задания свое зерно, поэтому результат не зависит от workers
+    tasks = [(x_name, o_name, size, k, min(chunk_size, games - start), seed * 1_000_003 + number)
+             for number, start in enumerate(range(0, games, chunk_size))]
+
+    start = time.perf_counter()
+    if workers > 1 and len(tasks) > 1:
+        with Pool(workers) as pool:
+            chunks = list(pool.imap_unordered(play_chunk, tasks))
+    else:
+        chunks = [play_chunk(task) for task in tasks]
+    elapsed = time.perf_counter() - start
+
+    x_wins, o_wins, draws, moves = (sum(column) for column in zip(*chunks))
+    return {'x_wins': x_wins / games,
+            'o_wins': o_wins / games,
+            'draws': draws / games,
+            'mean_length': moves / games,
+            'games_per_second': games / elapsed}
+
+
+def main() -> None:
+    """
+    Выводит статистику партий между двумя стратегиями
+    """
+    parser = argparse.ArgumentParser(description='Партии Крестиков-Ноликов без консоли')
+    parser.add_argument('-n', '--games',
+                        type=int,
+                        default=100000,
+                        help='Количество партий')
+    parser.add_argument('-x', '--x_strategy',
+                        choices=list(STRATEGIES),
+                        default='random',
+                        help='Стратегия X (ходит первым)')
+    parser.add_argument('-o', '--o_strategy',
+                        choices=list(STRATEGIES),
+                        default='random',
+                        help='Стратегия O')
+    parser.add_argument('-s', '--size',
+                        type=int,
+                        default=3,
+                        help='Размер поля')
+    parser.add_argument('-k', '--win_length',
+                        type=int,
+                        default=None,
+                        help='Сколько символов подряд нужно для победы (по умолчанию size)')
+    parser.add_argument('-w', '--workers',
+                        type=int,
+                        default=1,
+                        help='Количество процессов')
+    parser.add_argument('--seed',
+                        type=int,
+                        default=0,
+                        help='Зерно, чтобы прогоны были одинаковыми')
+    args = parser.parse_args()
+    if args.games < 1:
+        parser.error('количество партий должно быть положительным')
+
+    stats = simulate(args.games, args.x_strategy, args.o_strategy, args.size,
+                     args.win_length, args.workers, args.seed)
+    print(f'X ({args.x_strategy}) выиграл: {stats["x_wins"]:.2%}')
+    print(f'O ({args.o_strategy}) выиграл: {stats["o_wins"]:.2%}')
+    print(f'Ничьи: {stats["draws"]:.2%}')
+    print(f'Средняя длина партии: {stats["mean_length"]:.2f} ходов')
+    print(f'Партий в секунду: {stats["games_per_second"]:,.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,16 @@
 from typing import List, Set
+from tic_tac_toe_engine import GameState
+from tic_tac_toe_ai import ComputerPlayer, TIME_LIMIT
+from tic_tac_toe_db import SolvedTable
+from tic_tac_toe_records import RECORDS_FILE, append_game
 
 # Размер поля игры в Крестики-Нолики 3х3
 SIZE = 3
 
+# Сколько символов подряд нужно для победы
+# (например, SIZE = 15 и WIN_LENGTH = 5 - гомоку)
+WIN_LENGTH = SIZE
+
 def print_board(matrix: List[str]) -> None:
     """
     Выводит на экран игровое поле. Игровое поле - multi-line строка.
@@ -87,18 +95,20 @@ def input_value(user: str, last_input: Set[str]) -> int:
     return int(number)
 
 
-def cheak_win(user: str, board_matrix: List[str], step: int) -> bool:
+def cheak_win(user: str, game: GameState, step: int) -> bool:
     """
     Проверка победы.
 
     Выполняется проверка условий победы для строк, столбцов и диагоналей игрового поля.
+    GameState обновляет длины линий при каждом ходе, поэтому
+    проверка не зависит от размера поля.
     
     Parameters
     ----------
     user: str
         Игрок данного хода
-    board_matrix:  list
-        Матрица со значениями игрового поля
+    game: GameState
+        Состояние партии
     step: int
         Номер игрового хода
 
@@ -108,23 +118,9 @@ def cheak_win(user: str, board_matrix: List[str], step: int) -> bool:
         Если победа - True, если нет - False.
 
     """   
-    # Победа - кобимнация одинаковых символов длиной SIZE
-    win_combination = [user]*SIZE #['X', 'X', 'X'] 
-    win_case_list = []
-    
-    for i in range(SIZE):
-        win_case_list.append(board_matrix[i*SIZE:(i+1)*SIZE] == win_combination) # строки
-        win_case_list.append(board_matrix[i:SIZE*SIZE:SIZE] == win_combination) # столбцы
-    
-    # У двумерной матрицы две диагонали
-    main_diagonal = board_matrix[0:SIZE*SIZE:SIZE+1] == win_combination
-    antidiagonal = board_matrix[SIZE-1:SIZE*SIZE-2:SIZE-1] == win_combination   
-    win_case_list.append(main_diagonal)
-    win_case_list.append(antidiagonal)
-    
     result = False
-    # Выиграть можно не раньше, чем сделано SIZE+1 ходов    
-    if step > SIZE+1 and any(win_case_list):
+    # Выиграть можно не раньше, чем сделано 2*WIN_LENGTH-1 ходов
+    if step >= 2*WIN_LENGTH-1 and game.winner == user:
         print('\n' + f'Пользователь {user} выиграл!!!' + '\n')
         result = True
     
@@ -148,6 +144,19 @@ def cheak_pass(step: int, win: bool) -> None:
         print('Ничья!\n')
 
 
+def choose_computer() -> str:
+    """
+    Спрашивает, за кого будет играть компьютер.
+    
+    Returns
+    -------
+    str
+        "X" или "O" - символ компьютера, None - играют два человека
+    """
+    result = input('Играть против компьютера? Компьютер за O[о]\Компьютер за X[х]\Нет[что-угодно]: ')
+    return {'о': 'O', 'х': 'X'}.get(result)
+
+
 def next_game() -> bool:
     """
     Функция спрашивает разрешение на следущую игру.
@@ -162,44 +171,53 @@ def next_game() -> bool:
     return True if result == 'д' else False
     
  
-def tic() -> None:
+def tic(computer: str = None, computer_player: ComputerPlayer = None,
+        records_file: str = RECORDS_FILE) -> None:
     """
     Реализаует логику по правилам игры в "Крестики-Нолики".
     
-    Инициализируются слудующие перменные:
-    board_matrix - отображение 2D-матрицы в 1D. SIZE*SIZE элементов. 
-    step -  номер игрового хода
-    last_input - содержит занятые ячейки на игровом поле
-    user_item - "тумблер" переключения игроков.
-    user -  выступает одновременно и как "имя" игрока, и как символ, 
-                          которм заполняется выбранное играком поле
-    """
-    board_matrix = [' ' for _ in range(SIZE*SIZE)]
-    step = 0
-    last_input = set()
-    user_item = {'X':'O', 'O':'X'}
+    Parameters
+    ----------
+    computer: str
+        Символ, за который ходит компьютер (None - играют два человека)
+    computer_player: ComputerPlayer
+        Компьютерный игрок (ComputerPlayer или SolvedTable). Передается 
+        снаружи, чтобы таблица просчитанных позиций сохранялась между партиями
+    records_file: str
+        Файл записей партий (tic_tac_toe_records.py), куда дописывается
+        сыгранная партия. None - партия не записывается
     
-    # Первый ходит Х
-    user = user_item['O'] # user = 'X'
+    Состояние партии хранится в GameState:
+    game.board_matrix - отображение 2D-матрицы в 1D. SIZE*SIZE элементов. 
+    game.step -  номер игрового хода
+    game.last_input - содержит занятые ячейки на игровом поле
+    game.user -  выступает одновременно и как "имя" игрока, и как символ, 
+                          которм заполняется выбранное играком поле.
+                          GameState сам переключает игроков после хода
+    """
+    game = GameState(SIZE, WIN_LENGTH)
     win = False
     
     # Всего SIZE*SIZE-1 ходов за игру 
-    while step < SIZE*SIZE and not win:
+    while game.step < SIZE*SIZE and not win:
         
-        # Ход пользователя
-        user_input = input_value(user, last_input)
+        # Ход пользователя или компьютера
+        user = game.user
+        if user == computer:
+            user_input = computer_player.choose(game.board_matrix, user)
+            print(f'Компьютер {user} выбрал {user_input}')
+        else:
+            user_input = input_value(user, game.last_input)
         
-        last_input.add(user_input)
-        board_matrix[user_input-1] = user
-        print_board(board_matrix)
-        step += 1
+        game.play(user_input)
+        print_board(game.board_matrix)
         
         # Проверка на выигрыш и ничью
-        win = cheak_win(user, board_matrix, step)
-        cheak_pass(step, win)
-        
-        # Нужно сменить пользователя
-        user = user_item[user]
+        win = cheak_win(user, game, game.step)
+        cheak_pass(game.step, win)
+
+    if records_file is not None:
+        append_game(game, records_file)
 
         
 def main() -> None:
@@ -210,6 +228,10 @@ def main() -> None:
     Условие начала новой партии - согласие пользователя:
     suggestion = True.
     Об этом пользователя спрашивает функция next_game()
+    Перед каждой партией choose_computer() спрашивает, 
+    нужен ли компьютерный соперник.
+    На поле 3х3 компьютер берет ходы из таблицы решенных позиций,
+    если она построена (python tic_tac_toe_db.py), иначе ищет их сам.
     Логика игры реализована в функции tic()
     """
     
@@ -223,9 +245,14 @@ def main() -> None:
     """
     print(rules)
     
+    computer_player = None
+    if SIZE == 3 and WIN_LENGTH == 3:
+        computer_player = SolvedTable.load()
+    if computer_player is None:
+        computer_player = ComputerPlayer(SIZE, WIN_LENGTH, TIME_LIMIT)
     suggestion = True
     while suggestion:
-        tic()
+        tic(choose_computer(), computer_player)
         suggestion = next_game()
 
 